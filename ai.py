@@ -1,21 +1,44 @@
-# import globals
 from ui import get_UI
-import random
+from rng import default_rng
+from move import STRUGGLE_INDEX
+from damage import (expected_damage, crit_threshold, screened_defense,
+                    hit_chance)
+from typechart import type_ids, dual_chart
+from ids import (REST_ID, PHYSICAL, STATUS, STAT, DAMAGING, PRZ, BRN, FRZ,
+                 SLP, PSN, TXC, POISONED, OTHER, FD_LEVEL, FD_RANDOM,
+                 FD_HALF_CURRENT, FD_LAST_DAMAGE)
+from math import inf
 
+# Heuristic values used by GreedyAI, in units of the target's max HP
+STATUS_VALUE = {SLP: 0.6, FRZ: 0.6, PRZ: 0.4, TXC: 0.3, BRN: 0.3, PSN: 0.2}
+STAT_VALUE = 0.1
+KO_BONUS = 0.5
 
-def get_AI(ai_type, trainer, other):
+POISON = type_ids['Poison']
+GROUND = type_ids['Ground']
+ELECTRIC = type_ids['Electric']
+
+
+def get_AI(ai_type, trainer, other, rng=None, **kwargs):
     if ai_type == 'human':
-        return HumanAI(trainer, other)
+        return HumanAI(trainer, other, rng)
     elif ai_type == 'random':
-        return RandomAI(trainer, other)
+        return RandomAI(trainer, other, rng)
+    elif ai_type == 'greedy':
+        return GreedyAI(trainer, other, rng)
+    elif ai_type == 'mcts':
+        # Imported here since mcts builds on the AIs in this module
+        from mcts import MCTSAI
+        return MCTSAI(trainer, other, rng, **kwargs)
     else:
         raise ValueError(f'Invalid AI type {ai_type} !')
 
 
 class AI:
-    def __init__(self, trainer, other):
+    def __init__(self, trainer, other, rng=None):
         self.trainer = trainer
         self.other = other
+        self.rng = rng if rng else default_rng
 
     def get_action(self):
         pass
@@ -31,8 +54,8 @@ class AI:
 
 
 class HumanAI(AI):
-    def __init__(self, trainer, other):
-        super().__init__(trainer, other)
+    def __init__(self, trainer, other, rng=None):
+        super().__init__(trainer, other, rng)
         self.ui = get_UI(trainer)
 
     def get_action(self):
@@ -49,9 +72,32 @@ class HumanAI(AI):
         return ('swap', i-1)
 
 
+class ScriptedAI(AI):
+    """
+    Plays a fixed sequence of actions, e.g. the decisions from an event log.
+    Swaps after a faint are taken from the same sequence.
+    """
+    def __init__(self, trainer, other, actions, rng=None):
+        super().__init__(trainer, other, rng)
+        self._actions = iter(actions)
+
+    def get_action(self):
+        return self._next_action()
+
+    def get_swap(self):
+        return self._next_action()
+
+    def _next_action(self):
+        try:
+            return next(self._actions)
+        except StopIteration:
+            raise ValueError(f'Trainer {self.trainer.name} ran out of '
+                             'scripted actions!')
+
+
 class RandomAI(AI):
-    def __init__(self, trainer, other):
-        super().__init__(trainer, other)
+    def __init__(self, trainer, other, rng=None):
+        super().__init__(trainer, other, rng)
 
     def get_action(self):
         return self._random_get_action()
@@ -61,7 +107,7 @@ class RandomAI(AI):
 
     def _random_get_swap(self):
         while True:
-            index = random.randrange(len(self.trainer.party))
+            index = self.rng.randrange(len(self.trainer.party))
             if self.trainer.party[index] == self.trainer.active:
                 continue
             elif self.trainer.party[index].is_fainted():
@@ -75,7 +121,7 @@ class RandomAI(AI):
         if total_pp > 0:
             n = len(self.trainer.active.moves)
             while True:
-                index = random.randrange(n)
+                index = self.rng.randrange(n)
                 if self.trainer.active.moves[index].pp == 0:
                     continue
                 else:
@@ -83,3 +129,179 @@ class RandomAI(AI):
             return ('move', index)
         else:
             return ('move', 4)
+
+
+class GreedyAI(AI):
+    """
+    Uses the move with the highest score against the opponent's active
+    Pokemon (see score_move), and never swaps voluntarily. After a faint,
+    sends in the Pokemon with the best move score.
+    """
+    def __init__(self, trainer, other, rng=None):
+        super().__init__(trainer, other, rng)
+
+    def get_action(self):
+        user = self.trainer.active
+        if not user.sm.can_select_move:
+            return ('move', user.last_used_move_index)
+        index, score = best_move(user, self.other.active)
+        return ('move', index if index is not None else STRUGGLE_INDEX)
+
+    def get_swap(self):
+        # A Pokemon without PP scores -1, but can still be sent out
+        best, best_score = None, -inf
+        for i, pkmn in enumerate(self.trainer.party):
+            if pkmn is self.trainer.active or pkmn.is_fainted():
+                continue
+            score = best_move(pkmn, self.other.active)[1]
+            if score > best_score:
+                best, best_score = i, score
+        return ('swap', best)
+
+
+def best_move(user, target):
+    """
+    Returns (index, score) of user's best move with PP left, or (None, -1) if
+    it has none.
+    """
+    best, best_score = None, -1.0
+    matchup = None
+    for i, move in enumerate(user.moves):
+        if move.pp == 0:
+            continue
+        if matchup is None:
+            matchup = Matchup(user, target)
+        score = matchup.score(move.spec)
+        if score > best_score:
+            best, best_score = i, score
+    return best, best_score
+
+
+def score_move(spec, user, target):
+    return Matchup(user, target).score(spec)
+
+
+class Matchup:
+    """
+    Values of user and target needed to score any of user's moves, read once
+    per decision. score() is the GreedyAI heuristic.
+    """
+    __slots__ = ('user', 'target', 'acc_mult', 'user_types', 'target_types',
+                 'hp', 'max_hp', 'crit_base', '_stats')
+
+    def __init__(self, user, target):
+        self.user = user
+        self.target = target
+        self.acc_mult = user.accuracy*target.evasion
+        self.user_types = user.type_ids
+        self.target_types = target.type_ids
+        self.hp = target.current_hp
+        self.max_hp = target.max_hp
+        self.crit_base = user.base_spe
+        # (a, a_crit, d, d_crit) for Physical and Special moves
+        self._stats = {}
+
+    def score(self, spec):
+        """
+        Heuristic value of the move against target, in units of the target's
+        max HP: expected damage (accounting for accuracy, crits, STAB, type
+        multipliers and damage rolls) plus a bonus for a likely KO, and the
+        expected value of any status or stat change.
+        """
+        user, target = self.user, self.target
+        score = 0.0
+        category = spec.category_id
+        if category in DAMAGING:
+            accuracy = spec.accuracy
+            if accuracy != '-':
+                accuracy *= self.acc_mult
+            p_hit = hit_chance(accuracy)
+            damage, p_ko = self._expected_damage(spec)
+            score += p_hit*(damage/self.max_hp + KO_BONUS*p_ko)
+            if spec.status_accuracy and spec.status_target_id == OTHER:
+                if spec.type_id not in self.target_types:
+                    score += (p_hit * spec.status_accuracy/100
+                              * self._status_value(spec))
+        elif category == STATUS:
+            if spec.id == REST_ID:
+                score += 1 - user.current_hp/user.max_hp
+            elif spec.status_target_id == OTHER:
+                p_hit = self._effect_chance(spec.status_accuracy)
+                score += p_hit*self._status_value(spec)
+        elif category == STAT:
+            stat_target = target if spec.stat_target_id == OTHER else user
+            if stat_target.stats.can_change(spec.stat_index,
+                                            spec.stat_delta):
+                score += self._effect_chance(spec.stat_accuracy)*STAT_VALUE
+        return score
+
+    def _effect_chance(self, accuracy):
+        """
+        Chance that a status or stat effect passes its check. Unlike a move's
+        accuracy check (see damage.hit_chance), the effect checks roll a plain
+        percentage (globals.rng_check).
+        """
+        if accuracy == '-':
+            return 1.0
+        return min(accuracy*self.acc_mult/100, 1.0)
+
+    def _expected_damage(self, spec):
+        """
+        Returns (expected damage, chance to KO) of a hit, before accuracy.
+        """
+        if spec.base_power == '-':
+            return self._expected_fixed_damage(spec)
+        category = spec.category_id
+        stats = self._stats.get(category)
+        if stats is None:
+            stats = self._stats[category] = self._att_def(category)
+        a, a_crit, d, d_crit = stats
+        crit_chance = crit_threshold(self.crit_base, spec.high_crit)/256
+        return expected_damage(spec, self.user.level, self.user_types, a,
+                               a_crit, self.target_types, d, d_crit, self.hp,
+                               crit_chance)
+
+    def _att_def(self, category):
+        user, target = self.user, self.target
+        if category == PHYSICAL:
+            a, d = user.attack, target.defense
+            screen, a_index, d_index = 'reflect', 1, 2
+        else:
+            a, d = user.special, target.special
+            screen, a_index, d_index = 'lightscreen', 4, 4
+        if target.sm.get_flag(screen):
+            d = screened_defense(d)
+        return (a, user.stats.calculate_stat(a_index, crit=True), d,
+                target.stats.calculate_stat(d_index, crit=True))
+
+    def _expected_fixed_damage(self, spec):
+        user, target = self.user, self.target
+        hp = self.hp
+        if spec.ohko:
+            t1, t2 = self.target_types
+            immune = dual_chart[spec.type_id][t1][t2] == 0
+            if immune or user.speed < target.speed:
+                return 0, 0.0
+            return hp, 1.0
+        fd_type = spec.fixed_damage_id
+        if fd_type == FD_LEVEL:
+            damage = user.level
+        elif fd_type == FD_RANDOM:
+            # Psywave: uniform in [1, 1.5*level]
+            damage = (1 + int(1.5*user.level))/2
+        elif fd_type == FD_HALF_CURRENT:
+            damage = hp//2
+        elif fd_type == FD_LAST_DAMAGE:
+            damage = 0
+        else:
+            damage = spec.fixed_damage
+        return min(damage, hp), float(damage >= hp)
+
+    def _status_value(self, spec):
+        if self.target.sm.status_id:
+            return 0.0
+        if spec.status_id & POISONED and POISON in self.target_types:
+            return 0.0
+        if spec.type_id == ELECTRIC and GROUND in self.target_types:
+            return 0.0
+        return STATUS_VALUE.get(spec.status_id, 0.0)
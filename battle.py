@@ -6,7 +6,10 @@ from ai import get_AI
 # from moveuser import MoveUser
 # from turnmanager import TurnManager
 from roundmanager import RoundManager
-from ui import post_message
+from ui import post_message, default_sink
+from rng import RNG, BufferedRNG, derive_seed
+import instrument
+import time
 
 
 class Battle(Mediator):
@@ -14,36 +17,118 @@ class Battle(Mediator):
     Defines high-level class for managing the battle. Initializes Trainer and
     AI objects, selects the UI, and acts as the Mediator object through which
     all other classes send event messages.
+
+    Use ui='none' to run headless: nothing is printed and nothing waits for
+    input, so both trainers need non-human AIs.
+
+    Battle messages go to a sink (see ui): by default one that prints them
+    and waits for input with ui='text', and one that discards them
+    otherwise. Pass e.g. a ui.BufferedTextSink or ui.StructuredSink as sink
+    to keep them instead; it is available as battle.sink.
+
+    Every random draw in the battle comes from its own RNG object. Pass a seed
+    to make the battle reproducible, or an RNG (e.g. a BufferedRNG) to use it
+    directly.
+
+    Pass an eventlog.EventRecorder as recorder to log every decision and
+    random outcome of the battle. run() also records the end of the battle.
+
+    If instrumentation is enabled (see instrument), battle.instrumentation
+    holds the battle's counters and phase timers; otherwise it is None.
     """
 
     def __init__(self, ui='text',
                  trainer1_party='random', trainer2_party='random',
-                 trainer1_ai='human', trainer2_ai='random'):
-        super().__init__()
+                 trainer1_ai='human', trainer2_ai='random',
+                 seed=None, rng=None, recorder=None, sink=None):
+        super().__init__(sink if sink is not None else default_sink(ui))
         globals.UI = ui
-        self.trainer1 = Trainer('Player', trainer1_party)
-        self.trainer2 = Trainer('CPU', trainer2_party)
+        self.rng = rng if rng else RNG(seed)
+        self.recorder = recorder
+        self.round_no = 0
+        self.trainer1 = Trainer('Player', trainer1_party, rng=self.rng)
+        self.trainer2 = Trainer('CPU', trainer2_party, rng=self.rng)
         self.add_colleague(self.trainer1)
         self.add_colleague(self.trainer2)
         self.add_colleague(self.trainer1._active)
         self.add_colleague(self.trainer2._active)
-        self.trainer1.print()
-        post_message()
+        if globals.UI == 'text':
+            self.trainer1.print()
+            post_message()
         # self.trainer2.print()
-        ai1 = get_AI(trainer1_ai, trainer=self.trainer1, other=self.trainer2)
-        ai2 = get_AI(trainer2_ai, trainer=self.trainer2, other=self.trainer1)
+        # AIs draw from their own streams, so the battle's random outcomes
+        # only depend on the seed and the trainers' decisions
+        ai1 = get_AI(trainer1_ai, trainer=self.trainer1, other=self.trainer2,
+                     rng=self.rng.spawn('ai1'))
+        ai2 = get_AI(trainer2_ai, trainer=self.trainer2, other=self.trainer1,
+                     rng=self.rng.spawn('ai2'))
         self.trainer1.set_ai(ai1)
         self.trainer2.set_ai(ai2)
-        self.rm = RoundManager(self.trainer1, self.trainer2)
+        if recorder is not None:
+            self.rng.recorder = recorder
+            recorder.start_battle(self)
+        self.rm = RoundManager(self.trainer1, self.trainer2, self.rng)
         self.add_colleague(self.rm)
         self.add_colleague(self.rm.mu)
         # self.mu = MoveUser()
         # self.tm = TurnManager(self.mu)
+        # Counters and phase timers, if enabled (see instrument)
+        self.instrumentation = None
+        if instrument.ENABLED:
+            instrument.attach(self)
 
     @property
     def is_over(self):
         return (self.trainer1.all_fainted() or self.trainer2.all_fainted())
 
+    @property
+    def winner(self):
+        """
+        Returns 1 or 2 for the winning trainer, 0 for a draw (both parties
+        fainted), or None if the battle is not over.
+        """
+        out1 = self.trainer1.all_fainted()
+        out2 = self.trainer2.all_fainted()
+        if out1 and out2:
+            return 0
+        elif out2:
+            return 1
+        elif out1:
+            return 2
+        else:
+            return None
+
+    def set_rng(self, rng):
+        """
+        Makes every part of the battle draw from rng from now on.
+        """
+        self.rng = rng
+        self.trainer1.rng = rng
+        self.trainer2.rng = rng
+        self.rm.rng = rng
+        self.rm.mu.rng = rng
+        self.rm.tm.rng = rng
+
+    def snapshot(self):
+        """
+        Captures the battle's mutable state (HP, PP, stat stages, status bits
+        and counters, active Pokemon, seen moves) in nested tuples, for search
+        algorithms that branch from one state many times. The RNG state is
+        not included.
+        """
+        return (self.round_no, self.trainer1.snapshot(),
+                self.trainer2.snapshot(), self.rm.snapshot())
+
+    def restore(self, snapshot):
+        """
+        Returns the battle to a state captured by snapshot().
+        """
+        round_no, state1, state2, rm_state = snapshot
+        self.round_no = round_no
+        self.trainer1.restore(state1)
+        self.trainer2.restore(state2)
+        self.rm.restore(rm_state)
+
     def advance_round(self):
         """
         Wrapper method for RoundManager.round(), which advances the battle
@@ -64,8 +149,46 @@ class Battle(Mediator):
         # if apply_end_round:
         #     self.end_round(l_pkmn)
         # post_message(wait=False)
+        self.round_no += 1
+        if self.recorder is not None:
+            self.recorder.start_round(self.round_no)
         self.rm.round()
 
+    def run(self, max_rounds=None):
+        """
+        Advances the battle until one side is out of Pokemon, or until
+        max_rounds rounds have been played. Returns the number of rounds.
+        """
+        rounds = 0
+        while not self.is_over:
+            if max_rounds is not None and rounds >= max_rounds:
+                break
+            self.advance_round()
+            rounds += 1
+        if self.recorder is not None:
+            self.recorder.end_battle(self.winner, self.round_no)
+        return rounds
+
+    def play(self, max_rounds=None):
+        """
+        Generator version of run() for callers that make the trainers'
+        decisions themselves (see scheduler): yields a
+        trainer.DecisionRequest whenever a trainer has to decide, and must be
+        sent the chosen action. Returns the number of rounds.
+        """
+        rounds = 0
+        while not self.is_over:
+            if max_rounds is not None and rounds >= max_rounds:
+                break
+            self.round_no += 1
+            if self.recorder is not None:
+                self.recorder.start_round(self.round_no)
+            yield from self.rm.play_round()
+            rounds += 1
+        if self.recorder is not None:
+            self.recorder.end_battle(self.winner, self.round_no)
+        return rounds
+
     '''
     def turn(self, trainer, action, first=False):
         """
@@ -215,3 +338,46 @@ class Battle(Mediator):
         else:
             raise ValueError(f'Invalid action type {action[0]}')
     '''
+
+
+def simulate(party1='random', party2='random', ai1='random', ai2='random',
+             n=1, max_rounds=1000, seed=None, recorder=None):
+    """
+    Runs n complete headless battles back to back. Parties use the same
+    format as Trainer (a dict of species: (level, moves), or 'random', which
+    draws a new party for every battle). Battles still going after max_rounds
+    rounds count as draws. If seed is given, battle i is seeded with
+    derive_seed(seed, i), so the whole run is reproducible. If recorder (an
+    eventlog.EventRecorder) is given, every battle is logged to it.
+    Returns dict with the win/draw counts, total rounds, elapsed time and
+    battles per second, and the instrumentation totals if it is enabled.
+    """
+    wins1, wins2, draws, total_rounds = 0, 0, 0, 0
+    totals = instrument.Instrumentation() if instrument.ENABLED else None
+    start = time.perf_counter()
+    for i in range(n):
+        battle_seed = derive_seed(seed, i) if seed is not None else None
+        bat = Battle(ui='none', trainer1_party=party1, trainer2_party=party2,
+                     trainer1_ai=ai1, trainer2_ai=ai2,
+                     rng=BufferedRNG(battle_seed), recorder=recorder)
+        total_rounds += bat.run(max_rounds)
+        if totals is not None:
+            totals.add(bat.instrumentation)
+        winner = bat.winner
+        if winner == 1:
+            wins1 += 1
+        elif winner == 2:
+            wins2 += 1
+        else:
+            draws += 1
+    elapsed = time.perf_counter() - start
+    res = {'battles': n,
+           'wins1': wins1,
+           'wins2': wins2,
+           'draws': draws,
+           'rounds': total_rounds,
+           'elapsed': elapsed,
+           'battles_per_sec': n / elapsed if elapsed > 0 else float('inf')}
+    if totals is not None:
+        res['instrumentation'] = totals.snapshot()
+    return res
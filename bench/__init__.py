@@ -0,0 +1,13 @@
+"""
+Benchmark suite for the battle engine. Run it from the repository root with
+
+    python -m bench
+
+to time whole battles (battles per second) for fixed seeds and parties, and
+microbenchmarks of the engine's hot paths. Results are written to JSON and
+compared against bench/baseline.json; see python -m bench --help.
+
+Timings depend on the machine, so the committed baseline is only meaningful
+on comparable hardware; regenerate it with --update-baseline on the machine
+that runs the comparison.
+"""
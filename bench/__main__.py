@@ -0,0 +1,81 @@
+"""
+Command line entry point: python -m bench [options]. Exits with status 1 if
+any benchmark is slower than the baseline by more than both the tolerance
+and the measured noise (see suite.compare), and with status 2 without
+comparing if only one of the results and the baseline was run with --quick.
+"""
+
+from bench.suite import run, compare
+import argparse
+import json
+import os
+import sys
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Allowed relative slowdown before a benchmark counts as a regression
+TOLERANCE = 0.25
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench',
+                                     description='Benchmark the battle '
+                                                 'engine.')
+    parser.add_argument('-o', '--output', default='bench_results.json',
+                        help='where to write the results '
+                             '(default: %(default)s)')
+    parser.add_argument('-b', '--baseline', default=BASELINE,
+                        help='baseline results to compare against '
+                             '(default: bench/baseline.json)')
+    parser.add_argument('-t', '--tolerance', type=float, default=TOLERANCE,
+                        help='allowed relative slowdown '
+                             '(default: %(default)s)')
+    parser.add_argument('-k', dest='pattern',
+                        help='only run benchmarks whose names contain this')
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer battles and calls, for a smoke test')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write the results to the baseline instead of '
+                             'comparing')
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, pattern=args.pattern)
+    output = args.baseline if args.update_baseline else args.output
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f'Wrote {output}')
+    if args.update_baseline:
+        return 0
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f'No baseline at {args.baseline}')
+        return 0
+    if baseline.get('quick', False) != results['quick']:
+        modes = {False: 'full', True: 'quick'}
+        print(f'Not comparing {modes[results["quick"]]} results against the '
+              f'{modes[baseline.get("quick", False)]} baseline at '
+              f'{args.baseline}')
+        return 2
+    rows = compare(results, baseline, args.tolerance)
+    print(f'\n{"benchmark":40} {"baseline":>10} {"current":>10} '
+          f'{"slowdown":>9}')
+    for name, old, new, slowdown, status in rows:
+        if args.pattern and new is None:
+            # Not run this time
+            continue
+        old = '-' if old is None else f'{old:10.3f}'
+        new = '-' if new is None else f'{new:10.3f}'
+        slowdown = '' if slowdown is None else f'{slowdown:+9.1%}'
+        print(f'{name:40} {old:>10} {new:>10} {slowdown:>9}  {status}')
+    regressions = [row[0] for row in rows if row[4] == 'SLOWER']
+    if regressions:
+        print(f'\n{len(regressions)} benchmark(s) slower than the baseline '
+              f'by more than {args.tolerance:.0%} and their noise')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
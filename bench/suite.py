@@ -0,0 +1,226 @@
+"""
+Benchmark definitions. Every benchmark uses fixed seeds and parties, so runs
+differ only in timing. Battle benchmarks report battles per second (higher is
+better) and microbenchmarks the time per call in microseconds (lower is
+better); each is the best of several repeats, stored with a noise estimate:
+the relative gap between the median and the best repeat. The repeats are run
+in rounds of one repeat of every benchmark, so a slow spell of the machine
+is spread over all of them instead of hitting a few benchmarks entirely.
+"""
+
+import globals
+import testing
+from battle import Battle, simulate
+from pokemon import Pokemon
+from mediator import SwapEvent
+from rng import RNG
+from ids import PRZ
+from functools import partial
+from itertools import repeat
+import platform
+import statistics
+import time
+
+RESULTS_VERSION = 2
+SEED = 2024
+
+# Battles per repeat (full, quick)
+SCENARIO_BATTLES = (20, 4)
+RANDOM_BATTLES = (100, 20)
+# Calls per repeat of a microbenchmark (full, quick)
+MICRO_CALLS = (20000, 2000)
+REPEATS = (25, 5)
+
+# A change only counts if it is above the tolerance and this multiple of the
+# combined noise of the two runs
+NOISE_FACTOR = 1
+
+BATTLES_PER_SEC = 'battles/s'
+US_PER_CALL = 'us/call'
+
+
+def random_party(rng, size=6):
+    """
+    Returns a party dict of size random species at their randomizer levels,
+    with random movesets, drawn from rng.
+    """
+    party = {}
+    for name in rng.sample(globals.species_list, size):
+        species = globals.get_species_dict(name)
+        movepool = species['movepool']
+        moves = rng.sample(movepool, min(4, len(movepool)))
+        party[name] = (species['randomizer_level'], moves)
+    return party
+
+
+def spread(samples, best):
+    """
+    Returns the relative gap between the median of samples and best.
+    """
+    return abs(statistics.median(samples)/best - 1)
+
+
+def time_calls(func, number, scale=1):
+    """
+    Returns the time per call of func over number calls, in seconds times
+    scale.
+    """
+    start = time.perf_counter()
+    for _ in repeat(None, number):
+        func()
+    return scale*(time.perf_counter() - start)/number
+
+
+def battle_rate(party1, party2, n):
+    """
+    Returns the battles per second of n headless battles.
+    """
+    return simulate(party1, party2, n=n, seed=SEED)['battles_per_sec']
+
+
+def battle_benchmarks():
+    """
+    Returns {name: (party1, party2, battle counts)} for the battle benchmarks:
+    the testing.py scenarios, random 6v6 teams, and random parties drawn for
+    every battle.
+    """
+    rng = RNG(SEED)
+    benchmarks = {f'battle/{name}': (team, team, SCENARIO_BATTLES)
+                  for name, team in testing.d_teams.items()}
+    benchmarks['battle/random 6v6'] = (random_party(rng), random_party(rng),
+                                       RANDOM_BATTLES)
+    benchmarks['battle/random parties'] = ('random', 'random', RANDOM_BATTLES)
+    return benchmarks
+
+
+# Parties for the microbenchmarks
+MICRO_PARTY1 = {'Pikachu': (50, ['Thunderbolt', 'Thunder Wave', 'Body Slam',
+                                 'Seismic Toss'])}
+MICRO_PARTY2 = {'Snorlax': (50, ['Body Slam', 'Rest', 'Amnesia',
+                                 'Earthquake'])}
+
+
+def _micro_battle():
+    bat = Battle(ui='none', trainer1_party=MICRO_PARTY1,
+                 trainer2_party=MICRO_PARTY2, trainer1_ai='random',
+                 trainer2_ai='random', seed=SEED)
+    return bat, bat.trainer1.active, bat.trainer2.active
+
+
+def micro_benchmarks():
+    """
+    Returns {name: setup}, where setup() returns the function to time.
+    """
+
+    def calc_damage():
+        bat, user, target = _micro_battle()
+        mu = bat.rm.mu
+        move = user.moves[0]
+        return lambda: mu.calc_damage(move, user, target)
+
+    def before_move():
+        bat, user, target = _micro_battle()
+        tm = bat.rm.tm
+        return lambda: tm.before_move(user, target)
+
+    def before_move_paralyzed():
+        bat, user, target = _micro_battle()
+        tm = bat.rm.tm
+        user.sm.status_id = PRZ
+        return lambda: tm.before_move(user, target)
+
+    def recalculate_all():
+        bat, user, target = _micro_battle()
+        stats = user.stats
+        return stats.recalculate_all
+
+    def pokemon_init():
+        rng = RNG(SEED)
+        name, (level, moves) = next(iter(MICRO_PARTY1.items()))
+        return lambda: Pokemon(name, moves, level, rng)
+
+    def mediator_send():
+        bat, user, target = _micro_battle()
+        event = SwapEvent(bat.trainer1)
+        return lambda: bat.send(bat.trainer1, event)
+
+    return {'micro/MoveUser.calc_damage': calc_damage,
+            'micro/TurnManager.before_move': before_move,
+            'micro/TurnManager.before_move (PRZ)': before_move_paralyzed,
+            'micro/Stats.recalculate_all': recalculate_all,
+            'micro/Pokemon.__init__': pokemon_init,
+            'micro/Mediator.send': mediator_send}
+
+
+def run(quick=False, pattern=None, log=print):
+    """
+    Runs the benchmarks whose names contain pattern (all by default) and
+    returns the results dict that is written to JSON.
+    """
+    mode = 1 if quick else 0
+    # {name: (unit, function returning one sample)}
+    samplers = {}
+    for name, (party1, party2, counts) in battle_benchmarks().items():
+        if not pattern or pattern in name:
+            samplers[name] = (BATTLES_PER_SEC, partial(
+                battle_rate, party1, party2, counts[mode]))
+    for name, setup in micro_benchmarks().items():
+        if not pattern or pattern in name:
+            samplers[name] = (US_PER_CALL, partial(
+                time_calls, setup(), MICRO_CALLS[mode], scale=1e6))
+    samples = {name: [] for name in samplers}
+    for _ in range(REPEATS[mode]):
+        for name, (unit, sample) in samplers.items():
+            samples[name].append(sample())
+    results = {}
+    for name, (unit, sample) in samplers.items():
+        if unit == BATTLES_PER_SEC:
+            value = max(samples[name])
+        else:
+            value = min(samples[name])
+        noise = spread(samples[name], value)
+        results[name] = {'value': value, 'noise': noise, 'unit': unit}
+        digits = 1 if unit == BATTLES_PER_SEC else 3
+        log(f'{name:40} {value:12.{digits}f} {unit:9} (noise {noise:.1%})')
+    return {'version': RESULTS_VERSION,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'quick': quick,
+            'benchmarks': results}
+
+
+def compare(results, baseline, tolerance, noise_factor=NOISE_FACTOR):
+    """
+    Compares results against baseline results. Returns a list of
+    (name, baseline value, value, slowdown, status) rows, where slowdown is
+    the relative change in time per battle or call (positive is slower) and
+    status is 'ok', 'faster', 'SLOWER', 'new' or 'missing'. A benchmark is
+    only SLOWER or faster if the slowdown is above both tolerance and
+    noise_factor times the combined noise of the two runs.
+    """
+    rows = []
+    current = results['benchmarks']
+    base = baseline['benchmarks']
+    for name in sorted(current.keys() | base.keys()):
+        if name not in base:
+            rows.append((name, None, current[name]['value'], None, 'new'))
+            continue
+        if name not in current:
+            rows.append((name, base[name]['value'], None, None, 'missing'))
+            continue
+        old, new = base[name]['value'], current[name]['value']
+        if current[name]['unit'] == BATTLES_PER_SEC:
+            slowdown = old/new - 1
+        else:
+            slowdown = new/old - 1
+        # Version 1 results have no noise estimate
+        noise = base[name].get('noise', 0) + current[name].get('noise', 0)
+        limit = max(tolerance, noise_factor*noise)
+        if slowdown > limit:
+            status = 'SLOWER'
+        elif slowdown < -limit:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, old, new, slowdown, status))
+    return rows
@@ -0,0 +1,280 @@
+"""
+Pure versions of the damage math in MoveUser. MoveUser uses the plain
+functions; AIs use the memoized ones, which are keyed only by numbers (stats
+and type IDs) and the shared MoveSpec. The exact damage distributions and KO
+chances are memoized the same way; move_report computes them for two
+Pokemon.
+"""
+
+from globals import gen1_rng_threshold
+from typechart import chart, dual_chart
+from rng import MIN_DAMAGE_ROLL, MAX_DAMAGE_ROLL
+from ids import (PHYSICAL, FD_VALUE, FD_LEVEL, FD_RANDOM, FD_HALF_CURRENT,
+                 FD_LAST_DAMAGE)
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from math import ceil, comb
+
+NUM_ROLLS = MAX_DAMAGE_ROLL - MIN_DAMAGE_ROLL + 1
+
+
+def screened_defense(d):
+    """
+    Defense (or Special) doubled by Reflect (or Light Screen), with the Gen 1
+    overflow past 1024.
+    """
+    d *= 2
+    if d > 1024:
+        d = d % 1024
+    return d
+
+
+def scale_att_def(a, d):
+    """
+    Both stats are divided by 4 if either is above 255.
+    """
+    if a > 255 or d > 255:
+        a = a//4
+        # Avoid dividing by zero when a tiny stat is scaled down
+        d = max(d//4, 1)
+    return a, d
+
+
+def crit_threshold(base_spe, high_crit=None):
+    """
+    Critical hits happen when a random byte is below this threshold.
+    """
+    thresh = base_spe//2
+    if high_crit:
+        thresh = min(high_crit*thresh, 255)
+    return thresh
+
+
+def base_damage(level, power, a, d, stab, type1, type2, crit=False):
+    """
+    Damage before the random roll, from already scaled a and d.
+    """
+    crit_mult = 2 if crit else 1
+    damage = int((2*level*crit_mult/5 + 2)*power*a/(d*50) + 2)
+    damage = int(damage*stab)
+    damage = int(damage*type1)
+    damage = int(damage*type2)
+    return damage
+
+
+@lru_cache(maxsize=4096)
+def roll_table(damage):
+    """
+    Returns the sorted damage after each random roll, and its prefix sums.
+    """
+    if damage <= 1:
+        # No random roll for 1 damage
+        values = (damage,)*NUM_ROLLS
+    else:
+        values = tuple(damage*roll//255 for roll in
+                       range(MIN_DAMAGE_ROLL, MAX_DAMAGE_ROLL+1))
+    return values, tuple(accumulate(values, initial=0))
+
+
+def roll_outcomes(damage, hp):
+    """
+    Returns (mean damage, chance to KO) over all random rolls, for damage
+    before the roll against a target with hp HP left.
+    """
+    values, sums = roll_table(damage)
+    # Rolls from k on are capped at hp and knock the target out
+    k = bisect_left(values, hp)
+    kos = NUM_ROLLS - k
+    return (sums[k] + kos*hp)/NUM_ROLLS, kos/NUM_ROLLS
+
+
+@lru_cache(maxsize=1 << 16)
+def hit_damage(spec, level, user_types, a, a_crit, target_types, d, d_crit):
+    """
+    Returns the damage of a normal and of a critical hit before the random
+    roll, for a move with a numeric base power. Types are (type1, type2) IDs
+    from typechart. a and d are the effective stats for a normal hit
+    (including Reflect/Light Screen), a_crit and d_crit the unmodified stats
+    used by critical hits.
+    """
+    stab = 1.5 if spec.type_id in user_types else 1
+    type1 = chart[spec.type_id][target_types[0]]
+    type2 = chart[spec.type_id][target_types[1]]
+    a, d = scale_att_def(a, d)
+    a_crit, d_crit = scale_att_def(a_crit, d_crit)
+    return (base_damage(level, spec.base_power, a, d, stab, type1, type2),
+            base_damage(level, spec.base_power, a_crit, d_crit, stab, type1,
+                        type2, crit=True))
+
+
+def expected_damage(spec, level, user_types, a, a_crit, target_types, d,
+                    d_crit, hp, crit_chance):
+    """
+    Returns (expected damage, chance to KO) for a hit against a target with
+    hp HP left, averaging over critical hits and damage rolls (but not
+    accuracy). See hit_damage for the stats.
+    """
+    damage, damage_crit = hit_damage(spec, level, user_types, a, a_crit,
+                                     target_types, d, d_crit)
+    mean, ko = roll_outcomes(damage, hp)
+    mean_crit, ko_crit = roll_outcomes(damage_crit, hp)
+    return ((1 - crit_chance)*mean + crit_chance*mean_crit,
+            (1 - crit_chance)*ko + crit_chance*ko_crit)
+
+
+def hit_chance(accuracy):
+    """
+    Returns the chance that a Gen 1 accuracy check (see
+    globals.gen1_rng_check) passes, for an accuracy in percent (including
+    accuracy and evasion multipliers) or '-'.
+    """
+    if accuracy == '-':
+        return 1.0
+    # Hits when a random byte is below the threshold
+    return max(0, min(ceil(gen1_rng_threshold(accuracy)), 256))/256
+
+
+@lru_cache(maxsize=1 << 14)
+def damage_distribution(spec, level, user_types, a, a_crit, target_types, d,
+                        d_crit, crit_thresh):
+    """
+    Returns the exact distribution of the damage of one hit, as (damage,
+    probability) pairs in increasing order of damage, over critical hits (a
+    random byte below crit_thresh, see crit_threshold) and every damage roll.
+    Accuracy and the target's HP are not taken into account. See hit_damage
+    for the other arguments.
+    """
+    damage, damage_crit = hit_damage(spec, level, user_types, a, a_crit,
+                                     target_types, d, d_crit)
+    # Integer weights, out of 256 crit bytes times NUM_ROLLS rolls
+    weights = {}
+    for value in roll_table(damage)[0]:
+        weights[value] = weights.get(value, 0) + 256 - crit_thresh
+    for value in roll_table(damage_crit)[0]:
+        weights[value] = weights.get(value, 0) + crit_thresh
+    total = 256*NUM_ROLLS
+    return tuple((value, weights[value]/total) for value in sorted(weights))
+
+
+def fixed_damage_distribution(spec, user, target):
+    """
+    Returns the damage distribution (see damage_distribution) of a fixed
+    damage or one-hit KO move used by user against target, in their current
+    state. Counter is not supported, since its damage depends on the last
+    move used, and raises ValueError.
+    """
+    if spec.ohko:
+        # Fails against a faster target, and respects type immunities
+        t1, t2 = target.type_ids
+        if (dual_chart[spec.type_id][t1][t2] == 0
+                or user.speed < target.speed):
+            return ((0, 1.0),)
+        return ((target.current_hp, 1.0),)
+    fd_type = spec.fixed_damage_id
+    if fd_type == FD_VALUE:
+        return ((spec.fixed_damage, 1.0),)
+    if fd_type == FD_LEVEL:
+        return ((user.level, 1.0),)
+    if fd_type == FD_RANDOM:
+        # Psywave
+        top = int(1.5*user.level)
+        return tuple((value, 1/top) for value in range(1, top + 1))
+    if fd_type == FD_HALF_CURRENT:
+        # Super Fang
+        return ((max(target.current_hp//2, 1), 1.0),)
+    if fd_type == FD_LAST_DAMAGE:
+        raise ValueError(f'Damage of move {spec.name} depends on the last '
+                         'move used')
+    raise ValueError(f'Move {spec.name} does not do fixed damage')
+
+
+@lru_cache(maxsize=1 << 14)
+def ko_chances(distribution, hp, n, accuracy='-'):
+    """
+    Returns the chances to knock out a target with hp HP left within 1, 2,
+    ..., n uses of a move with the given damage distribution, as a tuple.
+    Every use hits with the Gen 1 chance for accuracy (see hit_chance).
+    Nothing else changes the target's HP between uses.
+    """
+    p_hit = hit_chance(accuracy)
+    # Distribution of the total damage so far, capped at hp
+    totals = {0: 1.0}
+    chances = []
+    for _ in range(n):
+        new = {}
+        for total, p in totals.items():
+            if total >= hp:
+                new[hp] = new.get(hp, 0.0) + p
+                continue
+            if p_hit < 1:
+                new[total] = new.get(total, 0.0) + p*(1 - p_hit)
+            p *= p_hit
+            for damage, q in distribution:
+                key = min(total + damage, hp)
+                new[key] = new.get(key, 0.0) + p*q
+        totals = new
+        chances.append(totals.get(hp, 0.0))
+    return tuple(chances)
+
+
+def halving_ko_chances(hp, n, accuracy='-'):
+    """
+    ko_chances for Super Fang, whose every hit takes half of the target's
+    current HP (at least 1), so the damage shrinks from hit to hit.
+    """
+    hits = 0
+    while hp > 0:
+        hp -= max(hp//2, 1)
+        hits += 1
+    p_hit = hit_chance(accuracy)
+    # At least hits of the first 1, 2, ..., n uses must hit
+    return tuple(float(sum(comb(uses, k)*p_hit**k*(1 - p_hit)**(uses - k)
+                           for k in range(hits, uses + 1)))
+                 for uses in range(1, n + 1))
+
+
+def damage_report(distribution, hp, n, accuracy='-'):
+    """
+    Returns a dict with a move's damage distribution, the chances to KO in
+    1..n hits ('ko'), and the chances to KO in 1..n uses when every use
+    must pass its accuracy check ('ko_accuracy').
+    """
+    return {'distribution': distribution,
+            'ko': ko_chances(distribution, hp, n),
+            'ko_accuracy': ko_chances(distribution, hp, n, accuracy)}
+
+
+def move_report(spec, user, target, n=4):
+    """
+    Returns the damage_report of user's move spec against target, from their
+    current stats, stat stages, screens, speed and HP. Raises ValueError for
+    Counter (see fixed_damage_distribution).
+    """
+    if spec.base_power == '-':
+        distribution = fixed_damage_distribution(spec, user, target)
+    else:
+        if spec.category_id == PHYSICAL:
+            a, d = user.attack, target.defense
+            screened, a_index, d_index = (target.sm.get_flag('reflect'), 1,
+                                          2)
+        else:
+            a, d = user.special, target.special
+            screened, a_index, d_index = (target.sm.get_flag('lightscreen'),
+                                          4, 4)
+        if screened:
+            d = screened_defense(d)
+        distribution = damage_distribution(
+            spec, user.level, user.type_ids, a,
+            user.stats.calculate_stat(a_index, crit=True), target.type_ids, d,
+            target.stats.calculate_stat(d_index, crit=True),
+            crit_threshold(user.base_spe, spec.high_crit))
+    accuracy = spec.accuracy
+    if accuracy != '-':
+        accuracy *= user.accuracy*target.evasion
+    if spec.fixed_damage_id == FD_HALF_CURRENT:
+        hp = target.current_hp
+        return {'distribution': distribution,
+                'ko': halving_ko_chances(hp, n),
+                'ko_accuracy': halving_ko_chances(hp, n, accuracy)}
+    return damage_report(distribution, target.current_hp, n, accuracy)
@@ -0,0 +1,200 @@
+"""
+Compiled cache of the game data. The species and moves JSON files and the
+type chart are parsed, validated and compiled once into a marshal file next to
+the data; later loads read that instead (marshal is built in and much faster
+to import and load than json or pickle). The cache is rebuilt when a
+JSON file's content hash (checked whenever its mtime or size changes) or the
+type chart (stored in the cache for comparison) no longer matches what it was
+built from.
+
+Run this module to rebuild the cache explicitly.
+"""
+
+import marshal
+import os
+import sys
+
+CACHE_VERSION = 1
+# The marshal format may change between Python versions
+CACHE_TAG = (CACHE_VERSION, sys.implementation.cache_tag)
+VALID_MULTS = (0, 0.5, 1, 2)
+SPECIES_KEYS = ('name', 'type1', 'type2', 'base_hp', 'base_att', 'base_def',
+                'base_spe', 'base_spc', 'randomizer_level', 'movepool')
+MOVE_KEYS = ('name', 'type', 'category', 'base_power', 'accuracy', 'max_pp',
+             'priority')
+
+
+def validate_chart(names, rows):
+    """
+    Raises ValueError unless rows is a square chart with one row and column
+    per type, valid multipliers, and a neutral 'None' type.
+    """
+    if len(rows) != len(names):
+        raise ValueError(f'Type chart has {len(rows)} rows for '
+                         f'{len(names)} types')
+    for offensive, row in zip(names, rows):
+        if len(row) != len(names):
+            raise ValueError(f'Type chart row {offensive} has {len(row)} '
+                             f'entries, expected {len(names)}')
+        for defensive, mult in zip(names, row):
+            if mult not in VALID_MULTS:
+                raise ValueError(f'Invalid multiplier {mult} for {offensive} '
+                                 f'against {defensive}')
+            if 'None' in (offensive, defensive) and mult != 1:
+                raise ValueError(f'Type None must be neutral, got {mult} for '
+                                 f'{offensive} against {defensive}')
+
+
+def validate_moves(moves, type_names, category_names):
+    for name, d in moves.items():
+        missing = [key for key in MOVE_KEYS if key not in d]
+        if missing:
+            raise ValueError(f'Move {name} is missing {missing}')
+        if d['name'] != name:
+            raise ValueError(f'Move {name} is named {d["name"]}')
+        if d['type'] not in type_names or d['type'] == 'None':
+            raise ValueError(f'Move {name} has invalid type {d["type"]}')
+        if d['category'] not in category_names:
+            raise ValueError(f'Move {name} has invalid category '
+                             f'{d["category"]}')
+
+
+def validate_species(species, moves, type_names):
+    for name, d in species.items():
+        missing = [key for key in SPECIES_KEYS if key not in d]
+        if missing:
+            raise ValueError(f'Species {name} is missing {missing}')
+        if d['name'] != name:
+            raise ValueError(f'Species {name} is named {d["name"]}')
+        for key in ('type1', 'type2'):
+            if d[key] not in type_names:
+                raise ValueError(f'Species {name} has invalid {key} '
+                                 f'{d[key]}')
+        unknown = [move for move in d['movepool'] if move not in moves]
+        if unknown:
+            raise ValueError(f'Species {name} has unknown moves {unknown}')
+
+
+def compile_types(names, rows):
+    """
+    Returns the type tables: type_dict[offensive][defensive] by name, and the
+    chart and dual_chart tuples indexed by type ID (see typechart).
+    """
+    validate_chart(names, rows)
+    chart = tuple(tuple(row) for row in rows)
+    dual_chart = tuple(tuple(tuple(row[t1]*row[t2] for t2 in range(len(names)))
+                             for t1 in range(len(names)))
+                       for row in chart)
+    type_dict = {offensive: dict(zip(names, row))
+                 for offensive, row in zip(names, rows)}
+    return {'type_dict': type_dict, 'type_chart': chart,
+            'dual_type_chart': dual_chart}
+
+
+def build(contents, type_names, type_rows, category_names):
+    """
+    Parses, validates and compiles the game data from the raw bytes of the
+    species and moves files.
+    """
+    import json
+    species = json.loads(contents['species'])
+    moves = json.loads(contents['moves'])
+    validate_moves(moves, type_names, category_names)
+    validate_species(species, moves, type_names)
+    data = {'species_dict': species, 'species_list': list(species),
+            'moves_dict': moves, 'moves_list': list(moves)}
+    data.update(compile_types(type_names, type_rows))
+    return data
+
+
+def _hash(content):
+    # hashlib (and json) are only imported when the cache needs checking
+    import hashlib
+    return hashlib.sha256(content).hexdigest()
+
+
+def _types_key(type_names, type_rows):
+    return (tuple(type_names), tuple(tuple(row) for row in type_rows))
+
+
+def _read_cache(cache_filename):
+    try:
+        with open(cache_filename, 'rb') as f:
+            # marshal.load reads a file in tiny chunks; loads is much faster
+            cache = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_TAG:
+        return None
+    return cache
+
+
+def _write_cache(cache_filename, cache):
+    # Write to a temporary file first so that concurrent readers never see
+    # a partial cache; a read-only data directory just means no cache
+    tmp = f'{cache_filename}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(marshal.dumps(cache))
+        os.replace(tmp, cache_filename)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load(sources, type_names, type_rows, category_names, cache_filename,
+         rebuild=False):
+    """
+    Returns the compiled game data for sources ({'species': path,
+    'moves': path}) and the type chart, validated against the move
+    category_names, from the cache at cache_filename when it is up to date,
+    and rebuilding it otherwise.
+    """
+    cache = None if rebuild else _read_cache(cache_filename)
+    types_key = _types_key(type_names, type_rows)
+    category_names = tuple(category_names)
+    stale = (cache is None or cache['types'] != types_key
+             or cache.get('categories') != category_names)
+    # Only hash a file when its mtime or size changed since the cache was
+    # built; an unchanged hash just refreshes the recorded stat
+    stats, hashes, contents = {}, {}, {}
+    for key, path in sources.items():
+        st = os.stat(path)
+        stats[key] = (st.st_mtime_ns, st.st_size)
+        cached = None if cache is None else cache['sources'].get(key)
+        if (not stale and cached is not None and cached[0] == path
+                and cached[1] == stats[key]):
+            hashes[key] = cached[2]
+            continue
+        with open(path, 'rb') as f:
+            contents[key] = f.read()
+        hashes[key] = _hash(contents[key])
+        if cached is None or cached[0] != path or cached[2] != hashes[key]:
+            stale = True
+    if not contents and not stale:
+        return cache['data']
+    if stale:
+        for key, path in sources.items():
+            if key not in contents:
+                with open(path, 'rb') as f:
+                    contents[key] = f.read()
+        data = build(contents, type_names, type_rows, category_names)
+    else:
+        data = cache['data']
+    _write_cache(cache_filename, {
+        'version': CACHE_TAG,
+        'types': types_key,
+        'categories': category_names,
+        'sources': {key: (path, stats[key], hashes[key])
+                    for key, path in sources.items()},
+        'data': data,
+    })
+    return data
+
+
+if __name__ == '__main__':
+    import globals
+    globals.load_data(rebuild=True)
+    print(f'Wrote {globals.cache_filename}')
@@ -0,0 +1,195 @@
+"""
+Compact binary log of battles. Every decision and every random outcome is
+written as one fixed-width record, so a battle takes a few bytes per turn and
+a log of many battles can be scanned in place through a memory map.
+
+File layout: a header (magic, version, record size), then records of
+(kind, side, value). Each battle starts with a BATTLE record followed by the
+four 16-bit words of its seed (SEED records, least significant first), and
+each round starts with a ROUND record. Decisions are recorded with the side
+(1 or 2) of the trainer making them; random outcomes with the side whose turn
+it is, or 0 outside of a turn (e.g. a speed tie).
+"""
+
+import mmap
+import struct
+
+MAGIC = b'PKLG'
+VERSION = 1
+HEADER = struct.Struct('<4sBxH')
+RECORD = struct.Struct('<BBH')
+
+# Records buffered in memory before each write to the file
+BUFFER_RECORDS = 4096
+
+# Battle structure
+BATTLE = 1       # side: 1 if the battle uses a BufferedRNG
+SEED = 2         # side: word index, value: 16 bits of the seed
+ROUND = 3        # value: round number
+END = 4          # side: winner (see NO_WINNER), value: rounds played
+# Decisions; value: move index or party index
+MOVE = 10
+SWAP = 11
+FAINT_SWAP = 12
+# Random outcomes
+ACCURACY = 20       # value: 1 if the move hit
+STATUS_CHANCE = 21  # value: 1 if the status check passed
+STAT_CHANCE = 22    # value: 1 if the stat change check passed
+CRIT = 23           # value: 1 for a critical hit
+DAMAGE_ROLL = 24    # value: damage multiplier, 217-255
+PSYWAVE = 25        # value: damage
+FULL_PRZ = 26       # value: 1 if fully paralyzed
+SLEEP_TURNS = 27    # value: number of turns
+HIT_SELF = 28       # value: 1 if the Pokemon hit itself in confusion
+SPEED_TIE = 29      # value: 1 if trainer 1 moves first
+
+kind_names = {BATTLE: 'battle', SEED: 'seed', ROUND: 'round', END: 'end',
+              MOVE: 'move', SWAP: 'swap', FAINT_SWAP: 'faint_swap',
+              ACCURACY: 'accuracy', STATUS_CHANCE: 'status_chance',
+              STAT_CHANCE: 'stat_chance', CRIT: 'crit',
+              DAMAGE_ROLL: 'damage_roll', PSYWAVE: 'psywave',
+              FULL_PRZ: 'full_przd', SLEEP_TURNS: 'sleep_turns',
+              HIT_SELF: 'hit_self', SPEED_TIE: 'speed_tie'}
+DECISION_KINDS = (MOVE, SWAP, FAINT_SWAP)
+OUTCOME_KINDS = tuple(range(ACCURACY, SPEED_TIE+1))
+
+# Winner of a battle that was stopped before either side ran out of Pokemon
+NO_WINNER = 255
+SEED_WORDS = 4
+
+
+class EventRecorder:
+    """
+    Streams the records of one or more battles to a file (a path, or a binary
+    file object). Attach it with Battle(recorder=...) or
+    simulate(recorder=...), and close it (or use it as a context manager)
+    when done.
+    """
+
+    def __init__(self, file, buffer_records=BUFFER_RECORDS):
+        if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+            self._file = open(file, 'wb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._buffer = bytearray()
+        self._buffer_size = buffer_records * RECORD.size
+        self._sides = {}
+        self.actor = 0
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, kind, side, value):
+        self._buffer += RECORD.pack(kind, side, value)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+
+    def start_battle(self, battle):
+        seed = battle.rng.seed
+        if not isinstance(seed, int) or not 0 <= seed < 1 << 64:
+            raise ValueError(f'Can only record battles with a 64-bit integer '
+                             f'seed (seed = {seed!r})')
+        self._sides = {battle.trainer1: 1, battle.trainer2: 2}
+        self.actor = 0
+        self.write(BATTLE, int(battle.rng.buffered), 0)
+        for i in range(SEED_WORDS):
+            self.write(SEED, i, (seed >> 16*i) & 0xFFFF)
+
+    def start_round(self, round_no):
+        self.actor = 0
+        self.write(ROUND, 0, round_no & 0xFFFF)
+
+    def end_battle(self, winner, rounds):
+        self.write(END, NO_WINNER if winner is None else winner,
+                   rounds & 0xFFFF)
+
+    def set_actor(self, trainer):
+        self.actor = self._sides[trainer]
+
+    def decision(self, trainer, action, faint=False):
+        if faint:
+            kind = FAINT_SWAP
+        else:
+            kind = MOVE if action[0] == 'move' else SWAP
+        self.write(kind, self._sides[trainer], action[1])
+
+    def outcome(self, kind, value):
+        self.write(kind, self.actor, value)
+
+
+class EventLogReader:
+    """
+    Memory-mapped, read-only view of an event log. Iterating yields
+    (kind, side, value) tuples; array() returns all records as a NumPy
+    structured array that shares memory with the file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f'{path} is not an event log')
+        magic, version, record_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f'{path} is not an event log')
+        if version != VERSION:
+            raise ValueError(f'Unsupported event log version {version}')
+        # Ignore a partial record at the end of a file still being written
+        self._n = (len(self._mmap) - HEADER.size) // RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        end = HEADER.size + self._n*RECORD.size
+        with memoryview(self._mmap)[HEADER.size:end] as view:
+            yield from RECORD.iter_unpack(view)
+
+    def close(self):
+        self._mmap.close()
+
+    def array(self):
+        import numpy as np
+        dtype = np.dtype([('kind', 'u1'), ('side', 'u1'), ('value', '<u2')])
+        return np.frombuffer(self._mmap, dtype=dtype, count=self._n,
+                             offset=HEADER.size)
+
+    def battles(self):
+        """
+        Yields (seed, buffered, records) for each battle in the log, where
+        records is the list of that battle's records after its seed.
+        """
+        seed, buffered, records = None, False, None
+        for kind, side, value in self:
+            if kind == BATTLE:
+                if records is not None:
+                    yield seed, buffered, records
+                seed, buffered, records = 0, bool(side), []
+            elif kind == SEED:
+                seed |= value << 16*side
+            elif records is not None:
+                records.append((kind, side, value))
+        if records is not None:
+            yield seed, buffered, records
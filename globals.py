@@ -1,6 +1,5 @@
 # import pandas as pd
-import random
-import json
+from rng import default_rng
 
 
 UI = 'text'
@@ -14,11 +13,12 @@ MIN_SLP_TURNS = 1
 MAX_SLP_TURNS = 7
 
 
-def rng_check(pct_chance):
+def rng_check(pct_chance, rng=None):
     if pct_chance == '-':
         ret = True
     else:
-        x = random.random()
+        rng = rng if rng else default_rng
+        x = rng.random()
         if x <= (pct_chance/100):
             ret = True
         else:
@@ -30,17 +30,19 @@ def gen1_rng_threshold(pct_chance):
     return pct_chance*255//100
 
 
-def gen1_rng_check(pct_chance):
+def gen1_rng_check(pct_chance, rng=None):
     if pct_chance == '-':
         ret = True
     else:
+        rng = rng if rng else default_rng
         thresh = gen1_rng_threshold(pct_chance)
-        ret = random.randrange(256) < thresh
+        ret = rng.byte() < thresh
     return ret
 
 
-def sleep_turns():
-    return random.randrange(MIN_SLP_TURNS, MAX_SLP_TURNS+1)
+def sleep_turns(rng=None):
+    rng = rng if rng else default_rng
+    return rng.randrange(MIN_SLP_TURNS, MAX_SLP_TURNS+1)
 
 
 def multihit():
@@ -55,9 +57,31 @@ def multiturn():
 # species_df = pd.read_csv('species_list_testing.csv')
 # species_list = list(species_df['name'])
 species_filename = 'data/species.json'
-with open(species_filename) as f:
-    species_dict = json.load(f)
-species_list = list(species_dict.keys())
+moves_filename = 'data/moves.json'
+cache_filename = 'data/cache.bin'
+
+# species_dict, species_list, moves_dict, moves_list and the type tables are
+# loaded from the compiled cache (see datacache) on first access
+_data = None
+_DATA_NAMES = ('species_dict', 'species_list', 'moves_dict', 'moves_list',
+               'type_dict', 'type_chart', 'dual_type_chart')
+
+
+def load_data(rebuild=False):
+    global _data
+    if _data is None or rebuild:
+        import datacache
+        _data = datacache.load({'species': species_filename,
+                                'moves': moves_filename},
+                               types, type_list, categories, cache_filename,
+                               rebuild)
+    return _data
+
+
+def __getattr__(name):
+    if name in _DATA_NAMES:
+        return load_data()[name]
+    raise AttributeError(f"module 'globals' has no attribute '{name}'")
 
 
 def get_species_dict(name):
@@ -65,35 +89,26 @@ def get_species_dict(name):
     return species_df[species_df['name'] == name].to_dict(orient='records')[0]
     '''
     try:
-        ret = species_dict[name]
+        ret = load_data()['species_dict'][name]
     except KeyError as e:
         print(f'In get_species_dict(), name not found: {e}')
         ret = None
     return ret
 
 
-# Define global moves data
-# moves_df = pd.read_csv('moves_list_testing.csv')
-# moves_list = list(moves_df['name'])
-moves_filename = 'data/moves.json'
-with open(moves_filename) as f:
-    moves_dict = json.load(f)
-moves_list = list(moves_dict.keys())
-
-
 def get_move_dict(name):
     '''
     return moves_df[moves_df['name'] == name].to_dict(orient='records')[0]
     '''
     try:
-        ret = moves_dict[name]
+        ret = load_data()['moves_dict'][name]
     except KeyError as e:
         print(f'In get_moves_dict(), name not found: {e}')
         ret = None
     return ret
 
 
-# Define global type interactions
+# Define global type interactions (validated and compiled in datacache)
 # type_chart = {}
 types = ['None', 'Normal', 'Fighting', 'Flying', 'Poison', 'Ground', 'Rock',
          'Bug', 'Ghost', 'Fire', 'Water', 'Grass', 'Electric', 'Psychic',
@@ -104,7 +119,7 @@ type_list = [
     [1, 2, 1, 0.5, 0.5, 1, 2, 0.5, 0, 1, 1, 1, 1, 0.5, 2, 1],       # Fighting
     [1, 1, 2, 1, 1, 1, 0.5, 2, 1, 1, 1, 2, 0.5, 1, 1, 1],           # Flying
     [1, 1, 1, 1, 0.5, 0.5, 0.5, 2, 0.5, 1, 1, 2, 1, 1, 1, 1],       # Poison
-    [1, 1, 1, 0, 2, 1, 2, 0.5, 1, 2, 1, 0.5, 2, 1, 1, 1, 1],        # Ground
+    [1, 1, 1, 0, 2, 1, 2, 0.5, 1, 2, 1, 0.5, 2, 1, 1, 1],           # Ground
     [1, 1, 0.5, 2, 1, 0.5, 1, 2, 1, 2, 1, 1, 1, 1, 2, 1],           # Rock
     [1, 1, 0.5, 0.5, 2, 1, 1, 1, 0.5, 0.5, 1, 2, 1, 2, 1, 1],       # Bug
     [1, 0, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 1, 0, 1, 1],               # Ghost
@@ -117,19 +132,16 @@ type_list = [
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2]                # Dragon
 ]
 
-type_dict = {}
-for i, offensive in enumerate(types):
-    d = {}
-    for j, defensive in enumerate(types):
-        d[defensive] = type_list[i][j]
-    type_dict[offensive] = d
+# Move categories (validated in datacache, numbered in ids)
+categories = ['Physical', 'Special', 'Status', 'Stat', 'VStatus', 'Unique']
 
 
 def get_type_mult(offensive, defensive):
-    return type_dict[offensive][defensive]
+    return load_data()['type_dict'][offensive][defensive]
 
 
 if __name__ == '__main__':
+    type_dict = load_data()['type_dict']
     for offensive in type_dict.keys():
         print(f'Offensive = {offensive}')
         print(type_dict[offensive])
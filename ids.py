@@ -0,0 +1,50 @@
+"""
+Interned integer IDs for the names in the game data. They are built once
+from the data files, and the engines compare IDs instead of strings; names
+are only used to read the data files and to print messages. Type IDs are in
+typechart.
+"""
+
+import globals
+
+# Species and moves, numbered in data file order
+species_names = tuple(globals.species_list)
+species_ids = {name: i for i, name in enumerate(species_names)}
+move_names = tuple(globals.moves_list)
+move_ids = {name: i for i, name in enumerate(move_names)}
+# Moves that the engine handles specially
+STRUGGLE_ID = move_ids['Struggle']
+HYPER_BEAM_ID = move_ids['Hyper Beam']
+REST_ID = move_ids['Rest']
+
+# Move categories
+category_names = tuple(globals.categories)
+PHYSICAL, SPECIAL, STATUS, STAT, VSTATUS, UNIQUE = range(len(category_names))
+category_ids = {name: i for i, name in enumerate(category_names)}
+DAMAGING = (PHYSICAL, SPECIAL)
+
+# Major status conditions. Each one is a single bit, so a StatusManager mask
+# holds at most one of them and can be tested against several at once.
+status_names = ('PRZ', 'BRN', 'FRZ', 'SLP', 'PSN', 'TXC', 'FNT')
+PRZ, BRN, FRZ, SLP, PSN, TXC, FNT = (1 << i for i in range(len(status_names)))
+NO_STATUS = 0
+POISONED = PSN | TXC
+status_ids = {name: 1 << i for i, name in enumerate(status_names)}
+status_ids[None] = NO_STATUS
+
+# Targets of a move's status or stat change (None for moves without one)
+SELF, OTHER = range(2)
+target_ids = {'self': SELF, 'other': OTHER, None: None}
+
+# Kinds of fixed damage; FD_VALUE moves always do their fixed_damage value
+FD_NONE, FD_VALUE, FD_LEVEL, FD_RANDOM, FD_HALF_CURRENT, FD_LAST_DAMAGE = \
+    range(6)
+fixed_damage_ids = {'level': FD_LEVEL, 'random': FD_RANDOM,
+                    'half_current': FD_HALF_CURRENT,
+                    'last_damage': FD_LAST_DAMAGE}
+
+
+def fixed_damage_id(value):
+    if not value:
+        return FD_NONE
+    return fixed_damage_ids.get(value, FD_VALUE)
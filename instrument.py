@@ -0,0 +1,206 @@
+"""
+Opt-in counters and phase timers for battles. Instrumentation is attached to
+a battle by replacing the methods it measures with counting or timing
+wrappers on that battle's own objects, so battles without it run exactly the
+same code as before and pay nothing for it.
+
+Enable it for every new Battle with enable(), or by setting the environment
+variable PYPKMN_INSTRUMENT=1 (which also reaches worker processes), or attach
+it to one battle with attach(battle). battle.instrumentation.snapshot() then
+returns that battle's data, and process_snapshot() the totals over every
+instrumented battle in this process.
+"""
+
+from eventlog import ACCURACY, CRIT, STATUS_CHANCE
+from mediator import FaintEvent
+import os
+import time
+import weakref
+
+COUNTERS = ('rounds', 'turns', 'moves', 'misses', 'crits', 'status_procs',
+            'faints', 'swaps', 'events')
+# Phases of RoundManager.round. Action selection includes every AI decision
+# (also swaps after a faint), and any simulated rounds an AI plays while
+# deciding count only towards it.
+PHASES = ('action_selection', 'turn_order', 'before_move', 'apply_move',
+          'after_move', 'end_round')
+
+ENABLED = os.environ.get('PYPKMN_INSTRUMENT', '') not in ('', '0')
+
+
+def enable(flag=True):
+    """
+    Turns instrumentation of new battles on or off.
+    """
+    global ENABLED
+    ENABLED = flag
+
+
+class Instrumentation:
+    """
+    Counters and phase timers for one battle (or totals over many). Phase
+    times are exclusive: an AI decision made during a move (a swap after a
+    faint) counts towards action selection, not towards the move.
+    """
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.events = {}
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self._deciding = False
+        # Time spent in phases nested inside the current one
+        self._nested = 0.0
+
+    def snapshot(self):
+        return {'counters': dict(self.counters),
+                'events': dict(self.events),
+                'phases': {phase: {'calls': self.calls[phase],
+                                   'seconds': self.seconds[phase]}
+                           for phase in PHASES}}
+
+    def add(self, other):
+        """
+        Adds the data of another Instrumentation to this one.
+        """
+        for key, n in other.counters.items():
+            self.counters[key] += n
+        for key, n in other.events.items():
+            self.events[key] = self.events.get(key, 0) + n
+        for phase in PHASES:
+            self.calls[phase] += other.calls[phase]
+            self.seconds[phase] += other.seconds[phase]
+
+    def _count(self, counter, func):
+        counters = self.counters
+
+        def counted(*args, **kwargs):
+            if not self._deciding:
+                counters[counter] += 1
+            return func(*args, **kwargs)
+        return counted
+
+    def _time(self, phase, func, decision=False, counter=None):
+        calls, seconds, counters = self.calls, self.seconds, self.counters
+
+        def timed(*args, **kwargs):
+            if self._deciding:
+                return func(*args, **kwargs)
+            outer = self._nested
+            self._nested = 0.0
+            self._deciding = decision
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._deciding = False
+                calls[phase] += 1
+                seconds[phase] += elapsed - self._nested
+                if counter is not None:
+                    counters[counter] += 1
+                self._nested = outer + elapsed
+        return timed
+
+    def _record(self, func):
+        counters = self.counters
+
+        def record(kind, value):
+            if kind == ACCURACY:
+                if not value:
+                    counters['misses'] += 1
+            elif kind == CRIT:
+                if value:
+                    counters['crits'] += 1
+            elif kind == STATUS_CHANCE:
+                if value:
+                    counters['status_procs'] += 1
+            return func(kind, value)
+        return record
+
+    def _send(self, func):
+        counters, events = self.counters, self.events
+
+        def send(colleague, event):
+            if not self._deciding:
+                counters['events'] += 1
+                name = type(event).__name__
+                events[name] = events.get(name, 0) + 1
+                if type(event) is FaintEvent:
+                    counters['faints'] += 1
+            return func(colleague, event)
+        return send
+
+    def _wrap(self, battle):
+        rm = battle.rm
+        # round() plays a round through play_round() too
+        rm.play_round = self._count('rounds', rm.play_round)
+        rm.turn = self._count('turns', rm.turn)
+        rm.get_turn_order = self._time('turn_order', rm.get_turn_order)
+        rm.end_round = self._time('end_round', rm.end_round)
+        rm.tm.before_move = self._time('before_move', rm.tm.before_move)
+        rm.tm.after_move = self._time('after_move', rm.tm.after_move)
+        rm.mu.apply_move = self._time('apply_move', rm.mu.apply_move,
+                                      counter='moves')
+        for trainer in (battle.trainer1, battle.trainer2):
+            trainer.get_action = self._time('action_selection',
+                                            trainer.get_action, decision=True)
+            trainer.get_swap = self._time('action_selection',
+                                          trainer.get_swap, decision=True)
+            trainer.swap = self._count('swaps', trainer.swap)
+        # Simulations swap in their own RNG, so only real outcomes count
+        battle.rng.record = self._record(battle.rng.record)
+        battle.send = self._send(battle.send)
+
+
+# Totals of battles that no longer exist, and the Instrumentation of those
+# that still do
+_retired = Instrumentation()
+_live = {}
+
+
+def attach(battle):
+    """
+    Instruments battle and returns its Instrumentation (also set as
+    battle.instrumentation).
+    """
+    inst = Instrumentation()
+    inst._wrap(battle)
+    battle.instrumentation = inst
+    key = id(inst)
+    _live[key] = inst
+    weakref.finalize(battle, _retire, key)
+    return inst
+
+
+def _retire(key):
+    _retired.add(_live.pop(key))
+
+
+def process_snapshot():
+    """
+    Returns the totals over every instrumented battle in this process.
+    """
+    total = Instrumentation()
+    total.add(_retired)
+    for inst in list(_live.values()):
+        total.add(inst)
+    return total.snapshot()
+
+
+def merge_snapshots(a, b):
+    """
+    Returns the sum of two snapshots (e.g. from different processes). Either
+    may be None.
+    """
+    if a is None or b is None:
+        return b if a is None else a
+    return {'counters': {key: a['counters'].get(key, 0) + n
+                         for key, n in b['counters'].items()},
+            'events': {key: a['events'].get(key, 0) + b['events'].get(key, 0)
+                       for key in a['events'].keys() | b['events'].keys()},
+            'phases': {phase: {'calls': (a['phases'][phase]['calls']
+                                         + b['phases'][phase]['calls']),
+                               'seconds': (a['phases'][phase]['seconds']
+                                           + b['phases'][phase]['seconds'])}
+                       for phase in PHASES}}
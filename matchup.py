@@ -0,0 +1,145 @@
+"""
+Adaptive matchup estimates. Instead of a fixed number of battles,
+estimate_matchup runs headless battles in batches and stops as soon as the
+result is known well enough, so lopsided matchups are settled after a few
+dozen battles.
+"""
+
+from battle import simulate
+from rng import derive_seed
+from math import log, sqrt
+from statistics import NormalDist
+import time
+
+BATCH_SIZE = 20
+MAX_BATTLES = 10000
+# Full width of the win rate confidence interval to stop at
+WIDTH = 0.05
+CONFIDENCE = 0.95
+# Win rates within MARGIN of 0.5 count as even for the sequential test
+MARGIN = 0.05
+
+# Reasons estimate_matchup stopped
+WIDTH_REACHED, DECIDED, MAX_REACHED = 'width', 'decided', 'max_battles'
+
+
+def wilson_interval(score, n, confidence=CONFIDENCE):
+    """
+    Returns the Wilson score interval (low, high) for a win rate of score
+    wins out of n battles (draws count as half a win).
+    """
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence)/2)
+    p = score/n
+    center = (p + z*z/(2*n))/(1 + z*z/n)
+    half = z*sqrt(p*(1 - p)/n + z*z/(4*n*n))/(1 + z*z/n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class SequentialTest:
+    """
+    Wald's sequential probability ratio test of whether trainer 1 wins a
+    decisive battle with probability p0 or p1, with error rates of at most
+    alpha either way. Draws carry no information and are ignored.
+    """
+
+    def __init__(self, p0, p1, alpha=1 - CONFIDENCE):
+        self.win_llr = log(p1/p0)
+        self.loss_llr = log((1 - p1)/(1 - p0))
+        self.upper = log((1 - alpha)/alpha)
+        self.llr = 0.0
+        # True once p1 is accepted, False once p0 is
+        self.decision = None
+
+    def update(self, wins1, wins2):
+        if self.decision is None:
+            self.llr += wins1*self.win_llr + wins2*self.loss_llr
+            if self.llr >= self.upper:
+                self.decision = True
+            elif self.llr <= -self.upper:
+                self.decision = False
+
+
+class MatchupTest:
+    """
+    Decides whether trainer 1 is better, worse or even (win rate within
+    margin of 0.5), with two one-sided SequentialTests of 0.5 against
+    0.5 + margin and 0.5 - margin.
+    """
+
+    def __init__(self, margin=MARGIN, alpha=1 - CONFIDENCE):
+        if not 0 < margin < 0.5:
+            raise ValueError(f'Invalid margin {margin}')
+        self.better = SequentialTest(0.5, 0.5 + margin, alpha)
+        self.worse = SequentialTest(0.5, 0.5 - margin, alpha)
+
+    def update(self, wins1, wins2):
+        self.better.update(wins1, wins2)
+        self.worse.update(wins1, wins2)
+
+    @property
+    def winner(self):
+        """
+        1 or 2 once the test has decided a winner, 0 once it has decided the
+        matchup is even, and None until then.
+        """
+        if self.better.decision:
+            return 1
+        if self.worse.decision:
+            return 2
+        if self.better.decision is False and self.worse.decision is False:
+            return 0
+        return None
+
+
+def estimate_matchup(party1, party2, ai1='random', ai2='random',
+                     width=WIDTH, confidence=CONFIDENCE, margin=MARGIN,
+                     batch_size=BATCH_SIZE, max_battles=MAX_BATTLES, seed=0,
+                     max_rounds=1000):
+    """
+    Estimates trainer 1's win rate (draws count as half a win) against
+    trainer 2. Parties use the same format as Trainer. Battles run in batches
+    of batch_size, and after each batch the estimate stops if the confidence
+    interval is narrower than width, or if a sequential test (see
+    MatchupTest) decides the winner, or after max_battles battles. Pass
+    margin=None to only stop on the interval width. Batch i is run with
+    derive_seed(seed, i), so the result is reproducible.
+
+    Returns the counts of battle.simulate, plus 'win_rate', 'interval'
+    (low, high), 'winner' (as MatchupTest.winner, or None if margin is None)
+    and 'stopped' (WIDTH_REACHED, DECIDED or MAX_REACHED).
+    """
+    if batch_size < 1 or max_battles < 1:
+        raise ValueError(f'Invalid batch size {batch_size} or maximum '
+                         f'{max_battles}')
+    test = (MatchupTest(margin, 1 - confidence) if margin is not None
+            else None)
+    res = {'battles': 0, 'wins1': 0, 'wins2': 0, 'draws': 0, 'rounds': 0}
+    stopped = MAX_REACHED
+    interval = (0.0, 1.0)
+    start = time.perf_counter()
+    batch = 0
+    while res['battles'] < max_battles:
+        n = min(batch_size, max_battles - res['battles'])
+        batch_res = simulate(party1, party2, ai1, ai2, n, max_rounds,
+                             seed=derive_seed(seed, batch))
+        batch += 1
+        for key in res:
+            res[key] += batch_res[key]
+        score = res['wins1'] + res['draws']/2
+        interval = wilson_interval(score, res['battles'], confidence)
+        if test is not None:
+            test.update(batch_res['wins1'], batch_res['wins2'])
+            if test.winner is not None:
+                stopped = DECIDED
+                break
+        if interval[1] - interval[0] < width:
+            stopped = WIDTH_REACHED
+            break
+    res['elapsed'] = time.perf_counter() - start
+    res['win_rate'] = (res['wins1'] + res['draws']/2)/res['battles']
+    res['interval'] = interval
+    res['winner'] = test.winner if test is not None else None
+    res['stopped'] = stopped
+    return res
@@ -0,0 +1,294 @@
+"""
+Monte Carlo tree search AI. Each round is a simultaneous move, so the tree
+uses decoupled UCT: both trainers pick their own action at every node with
+UCB1, and a node's children are keyed by the pair of actions. Simulations
+restore a snapshot of the real battle, play headless rounds through
+RoundManager, and finish with RandomAI playouts.
+"""
+
+import globals
+from ai import AI, RandomAI
+from battle import Battle
+from trainer import legal_actions, legal_swaps, is_legal
+from rng import RNG, derive_seed
+from ui import NullSink
+from concurrent.futures import ProcessPoolExecutor
+from math import log, sqrt
+import time
+
+# Wall-clock time per decision, in seconds
+TIME_BUDGET = 0.05
+# UCB1 exploration constant, for rewards in [0, 1]
+EXPLORATION = sqrt(2)
+# Playouts stop after this many rounds and score the remaining HP instead
+ROLLOUT_ROUNDS = 30
+
+# Simulated rounds discard their messages
+NULL_SINK = NullSink()
+
+
+def ucb_select(counts, values, total):
+    """
+    Returns the index of the option with the highest UCB1 score, trying
+    every option once first.
+    """
+    log_n = log(total) if total else 0.0
+    best, best_score = 0, -1.0
+    for i, n in enumerate(counts):
+        if n == 0:
+            return i
+        score = values[i]/n + EXPLORATION*sqrt(log_n/n)
+        if score > best_score:
+            best, best_score = i, score
+    return best
+
+
+class _PlannedAI(RandomAI):
+    """
+    Plays the action planned by the tree search, if it is still legal, and
+    random actions otherwise.
+    """
+
+    def __init__(self, trainer, other, rng):
+        super().__init__(trainer, other, rng)
+        self.action = None
+
+    def get_action(self):
+        action = self.action
+        if action is not None and is_legal(self.trainer, action):
+            return action
+        return self._random_get_action()
+
+
+class _Node:
+    """
+    Decoupled UCT node: separate visit counts and reward totals for each
+    trainer's actions, and children keyed by (index1, index2).
+    """
+    __slots__ = ('actions', 'visits', 'counts', 'values', 'children')
+
+    def __init__(self, actions1, actions2):
+        self.actions = (actions1, actions2)
+        self.visits = 0
+        self.counts = ([0]*len(actions1), [0]*len(actions2))
+        self.values = ([0.0]*len(actions1), [0.0]*len(actions2))
+        self.children = {}
+
+    def select(self, player):
+        return ucb_select(self.counts[player], self.values[player],
+                          self.visits)
+
+    def update(self, i, j, reward):
+        # reward is for player 0; player 1 scores 1 - reward
+        self.visits += 1
+        self.counts[0][i] += 1
+        self.values[0][i] += reward
+        self.counts[1][j] += 1
+        self.values[1][j] += 1.0 - reward
+
+
+class MCTSAI(AI):
+    """
+    Plans each action with decoupled-UCT Monte Carlo tree search over the
+    simultaneous-move rounds of the battle, within a wall-clock time budget.
+    With workers > 1, independent searches run in a process pool and their
+    root statistics are merged (call close() to shut the pool down).
+    Swaps after a faint are chosen with flat UCB1 over random playouts.
+    """
+
+    def __init__(self, trainer, other, rng=None, time_budget=TIME_BUDGET,
+                 workers=None):
+        super().__init__(trainer, other, rng)
+        self.time_budget = time_budget
+        self.workers = workers
+        self._executor = None
+
+    def get_action(self):
+        actions, counts, values = self._search_action()
+        return actions[max(range(len(actions)), key=counts.__getitem__)]
+
+    def get_swap(self):
+        swaps = legal_swaps(self.trainer)
+        if len(swaps) == 1:
+            return swaps[0]
+        with _Simulation(self) as sim:
+            counts = [0]*len(swaps)
+            values = [0.0]*len(swaps)
+            deadline = time.perf_counter() + self.time_budget
+            total = 0
+            while total < len(swaps) or time.perf_counter() < deadline:
+                i = ucb_select(counts, values, total)
+                sim.reset()
+                self.trainer.swap(swaps[i][1])
+                # In a double KO, the opponent's replacement is still
+                # pending; the planned AIs pick it at random
+                sim.battle.rm.replace_fainted()
+                # A faint ends the round, so play out from the next one
+                reward = sim.rollout()
+                counts[i] += 1
+                values[i] += reward
+                total += 1
+        return swaps[max(range(len(swaps)), key=counts.__getitem__)]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _search_action(self):
+        """
+        Returns (actions, visit counts, reward totals) for this trainer's
+        actions at the root.
+        """
+        if self.workers is None or self.workers <= 1:
+            with _Simulation(self) as sim:
+                return sim.search(time.perf_counter() + self.time_budget)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        task = _search_task(self)
+        seed = self.rng.randrange(1 << 32)
+        futures = [self._executor.submit(_run_search_task, task,
+                                         derive_seed(seed, i))
+                   for i in range(self.workers)]
+        merged = {}
+        for future in futures:
+            for action, n, value in zip(*future.result()):
+                n0, value0 = merged.get(action, (0, 0.0))
+                merged[action] = (n0 + n, value0 + value)
+        actions = list(merged)
+        return (actions, [merged[a][0] for a in actions],
+                [merged[a][1] for a in actions])
+
+
+class _Simulation:
+    """
+    Context manager that runs simulations on the AI's own battle. On entry it
+    snapshots the battle and replaces the output, event recorder, RNG and
+    both trainers' AIs; on exit it puts everything back.
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+        self.battle = ai.trainer.mediator
+        self.me = ai.trainer
+        self.rng = RNG(ai.rng.randrange(1 << 32))
+
+    def __enter__(self):
+        bat = self.battle
+        self._saved = (globals.UI, bat.sink, bat.recorder, bat.rng,
+                       bat.trainer1._ai, bat.trainer2._ai)
+        self._root = bat.snapshot()
+        globals.UI = 'none'
+        bat.sink = NULL_SINK
+        bat.recorder = None
+        bat.set_rng(self.rng)
+        self.planned = (_PlannedAI(bat.trainer1, bat.trainer2, self.rng),
+                        _PlannedAI(bat.trainer2, bat.trainer1, self.rng))
+        bat.trainer1.set_ai(self.planned[0])
+        bat.trainer2.set_ai(self.planned[1])
+        return self
+
+    def __exit__(self, *exc):
+        bat = self.battle
+        bat.restore(self._root)
+        ui, sink, recorder, rng, ai1, ai2 = self._saved
+        globals.UI = ui
+        bat.sink = sink
+        bat.recorder = recorder
+        bat.set_rng(rng)
+        bat.trainer1.set_ai(ai1)
+        bat.trainer2.set_ai(ai2)
+
+    def reset(self):
+        self.battle.restore(self._root)
+
+    def reward(self):
+        """
+        Result for the AI's trainer: 1 for a win, 0 for a loss, 0.5 for a
+        draw, or its share of the total remaining HP fraction if the battle
+        is not over.
+        """
+        bat = self.battle
+        winner = bat.winner
+        mine = 1 if self.me is bat.trainer1 else 2
+        if winner is None:
+            hp = [sum(p.current_hp/p.max_hp for p in t.party)
+                  for t in (bat.trainer1, bat.trainer2)]
+            total = hp[0] + hp[1]
+            return hp[mine-1]/total if total else 0.5
+        elif winner == 0:
+            return 0.5
+        return 1.0 if winner == mine else 0.0
+
+    def rollout(self):
+        self.planned[0].action = None
+        self.planned[1].action = None
+        bat = self.battle
+        for _ in range(ROLLOUT_ROUNDS):
+            if bat.is_over:
+                break
+            bat.advance_round()
+        return self.reward()
+
+    def search(self, deadline):
+        bat = self.battle
+        t1, t2 = bat.trainer1, bat.trainer2
+        root = _Node(legal_actions(t1), legal_actions(t2))
+        while root.visits == 0 or time.perf_counter() < deadline:
+            self.reset()
+            node = root
+            path = []
+            while not bat.is_over:
+                i, j = node.select(0), node.select(1)
+                path.append((node, i, j))
+                self.planned[0].action = node.actions[0][i]
+                self.planned[1].action = node.actions[1][j]
+                bat.advance_round()
+                child = node.children.get((i, j))
+                if child is None:
+                    if not bat.is_over:
+                        node.children[(i, j)] = _Node(legal_actions(t1),
+                                                      legal_actions(t2))
+                    break
+                node = child
+            # Reward for trainer 1, matching the node statistics
+            reward = self.rollout()
+            if self.me is t2:
+                reward = 1.0 - reward
+            for node, i, j in path:
+                node.update(i, j, reward)
+        player = 0 if self.me is t1 else 1
+        return (root.actions[player], root.counts[player],
+                root.values[player])
+
+
+def _search_task(ai):
+    """
+    Picklable description of the current battle for a worker process: each
+    party as a Trainer party dict, the AI's side, its time budget, and the
+    battle snapshot.
+    """
+    bat = ai.trainer.mediator
+    parties = [{pkmn.name: (pkmn.level, [move.name for move in pkmn.moves])
+                for pkmn in trainer.party}
+               for trainer in (bat.trainer1, bat.trainer2)]
+    side = 1 if ai.trainer is bat.trainer1 else 2
+    return parties, side, ai.time_budget, bat.snapshot()
+
+
+def _run_search_task(task, seed):
+    """
+    Worker entry point: rebuilds the battle and runs one search.
+    """
+    parties, side, time_budget, snapshot = task
+    deadline = time.perf_counter() + time_budget
+    bat = Battle(ui='none', trainer1_party=parties[0],
+                 trainer2_party=parties[1], trainer1_ai='random',
+                 trainer2_ai='random', seed=seed)
+    bat.restore(snapshot)
+    trainer, other = ((bat.trainer1, bat.trainer2) if side == 1
+                      else (bat.trainer2, bat.trainer1))
+    ai = MCTSAI(trainer, other, RNG(seed), time_budget)
+    trainer.set_ai(ai)
+    with _Simulation(ai) as sim:
+        return sim.search(deadline)
@@ -1,27 +1,92 @@
+class Event:
+    """
+    Base class for the small event objects sent between colleagues.
+    """
+    __slots__ = ()
+
+
+class FaintEvent(Event):
+    __slots__ = ('pkmn',)
+
+    def __init__(self, pkmn):
+        self.pkmn = pkmn
+
+
+class SwapEvent(Event):
+    __slots__ = ('trainer',)
+
+    def __init__(self, trainer):
+        self.trainer = trainer
+
+
+class HyperBeamKOEvent(Event):
+    __slots__ = ('pkmn',)
+
+    def __init__(self, pkmn):
+        self.pkmn = pkmn
+
+
 class Mediator:
-    def __init__(self):
-        self._colleagues = []
+    """
+    Delivers events to the colleagues subscribed to each event type. Each
+    subscription table entry is a tuple of (colleague, handler) pairs, so
+    sending an event only visits the colleagues that handle it, and handlers
+    can safely add or remove colleagues while an event is being delivered.
+    Colleagues post their messages to the mediator's sink (see ui).
+    """
+
+    def __init__(self, sink=None):
+        self._subscribers = {}
+        self.sink = sink
 
     def add_colleague(self, colleague):
-        self._colleagues.append(colleague)
         colleague.mediator = self
+        for event_type, name in colleague.event_handlers.items():
+            subs = self._subscribers.get(event_type, ())
+            self._subscribers[event_type] = subs + ((colleague,
+                                                     getattr(colleague, name)),)
 
     def remove_colleague(self, colleague):
-        self._colleagues.remove(colleague)
+        for event_type in colleague.event_handlers:
+            self._subscribers[event_type] = tuple(
+                sub for sub in self._subscribers[event_type]
+                if sub[0] is not colleague)
         colleague.mediator = None
 
-    def send(self, colleague, event_d):
-        for col in self._colleagues:
-            if col != colleague:
-                col.receive_event(event_d)
+    def replace_colleague(self, old, new):
+        """
+        Swaps in new for old, keeping old's place in every subscription.
+        Both colleagues must be of the same class.
+        """
+        for event_type, name in new.event_handlers.items():
+            self._subscribers[event_type] = tuple(
+                (new, getattr(new, name)) if sub[0] is old else sub
+                for sub in self._subscribers[event_type])
+        old.mediator = None
+        new.mediator = self
+
+    def send(self, colleague, event):
+        for col, handler in self._subscribers.get(type(event), ()):
+            if col is not colleague:
+                handler(event)
 
 
 class Colleague:
+    __slots__ = ('mediator',)
+
+    # Maps each event type the colleague handles to the name of its handler
+    event_handlers = {}
+
     def __init__(self):
         self.mediator = None
 
-    def send_event(self, event_d):
-        self.mediator.send(self, event_d)
+    def send_event(self, event):
+        self.mediator.send(self, event)
 
-    def receive_event(self, event_d):
-        print(f'{self.__class__.__name__} received event_d = {event_d}')
+    def post(self, msg_id, *args):
+        """
+        Posts the battle message msg_id (see messages.templates) with its
+        arguments to the mediator's sink. A msg_id of None posts nothing.
+        """
+        if msg_id is not None:
+            self.mediator.sink.post(msg_id, args)
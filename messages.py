@@ -0,0 +1,78 @@
+"""
+Templates of the messages the battle engine posts, by ID. Engine code posts
+an ID and its arguments with Colleague.post (see mediator), and the message
+is only formatted by a sink that displays it (see ui).
+"""
+
+templates = {
+    # Moves
+    'out_of_pp': '{} is out of PP!',
+    'used_move': '{} used {}!',
+    'missed': 'The move missed!',
+    'took_damage': '{} took {} damage!',
+    'critical_hit': 'Critical hit!',
+    'super_effective': 'It\'s super effective!',
+    'not_very_effective': 'It\'s not very effective...',
+    'no_effect': 'It has no effect...',
+    'move_failed': 'The move failed!',
+    'move_no_effect': 'The move has no effect!',
+    'ohko': 'One-hit KO!',
+    # Major status, formatted with the target's name
+    'paralyzed': '{} became paralyzed!',
+    'burned': '{} was burned!',
+    'frozen': '{} was frozen solid!',
+    'rested': '{} fell asleep and became healthy!',
+    'fell_asleep': '{} fell asleep!',
+    'poisoned': '{} was poisoned!',
+    'badly_poisoned': '{} was badly poisoned!',
+    'thawed': '{} was thawed!',
+    'already_paralyzed': '{} is already paralyzed!',
+    'already_burned': '{} is already burned!',
+    'already_frozen': '{} is already frozen!',
+    'already_asleep': '{} is already asleep!',
+    'already_poisoned': '{} is already poisoned!',
+    # Stat changes, formatted with the Pokemon's name and the stat
+    'stat_rose': '{}\'s {} increased!',
+    'stat_rose_sharply': '{}\'s {} sharply increased!',
+    'stat_fell': '{}\'s {} decreased!',
+    'stat_fell_sharply': '{}\'s {} sharply decreased!',
+    'stat_max': '{}\'s {} could not be raised any more!',
+    'stat_min': '{}\'s {} could not be lowered any more!',
+    # Before and after moves
+    'fully_paralyzed': '{} is fully paralyzed!',
+    'frozen_solid': '{} is frozen solid!',
+    'hit_itself': '{} hit itself in confusion!',
+    'seed_drained': '{}\'s health was drained!',
+    'burn_damage': '{} was affected by its burn!',
+    'poison_damage': '{} was affected by its poison!',
+    'recurring_damage_debug': '(-{} HP, N = {})',
+    'seed_healed': '{} was healed!',
+    # StatusManager flags and counters, formatted with the Pokemon's name
+    'flinch': '{} flinched!',
+    'seed': '{} was seeded!',
+    'lightscreen': '{} put up a Lightscreen!',
+    'reflect': '{} put up a Reflect!',
+    'recharge': '{} has to recharge!',
+    'sleep': '{} fell asleep!',
+    'sleep_still': '{} is fast asleep!',
+    'sleep_expired': '{} woke up!',
+    'toxic': '{} was badly Poisoned!',
+    'confusion': '{} became confused!',
+    'confusion_still': '{} is confused!',
+    'confusion_expired': '{} snapped out of confusion!',
+    'disable': '{} became Disabled!',
+    'disable_still': '{} is Disabled!',
+    'disable_expired': '{} is Disabled no more!',
+    'multiturn_still': '{} is thrashing about!',
+    'multiturn_expired': '{} is fatigued!',
+    # Trainers and Pokemon
+    'fainted': '{} fainted!',
+    'sent_out': 'Go, {}!',
+}
+
+
+def render(msg_id, args):
+    """
+    Returns the text of a message.
+    """
+    return templates[msg_id].format(*args)
@@ -1,19 +1,90 @@
 import globals
+from typechart import type_ids
+from ids import (move_ids, category_ids, status_ids, target_ids,
+                 fixed_damage_id)
 
+# Action index used for Struggle, which is not part of any moveset
+STRUGGLE_INDEX = 4
 
-class Move:
-    def __init__(self, name):
-        d = globals.get_move_dict(name)
-        if not d:
-            raise KeyError(f'Move(): name = {name} not found!')
+
+def _field_name(key):
+    # Some data keys ('2_turn', '2_turn_message') aren't valid identifiers
+    return 'two' + key[1:] if key[0] == '2' else key
+
+
+# Integer IDs (see ids) set on each MoveSpec
+_ID_FIELDS = ('id', 'type_id', 'category_id', 'status_id', 'status_target_id',
+              'stat_target_id', 'fixed_damage_id')
+
+
+class MoveSpec:
+    """
+    Immutable data for one move, loaded once from globals.moves_dict and
+    shared by every Pokemon that knows the move.
+    """
+
+    __slots__ = tuple(sorted({_field_name(key)
+                              for d in globals.moves_dict.values()
+                              for key in d} | set(_ID_FIELDS)))
+
+    def __init__(self, d):
         for key, value in d.items():
-            setattr(self, key, value)
-        self._pp = self.max_pp
+            object.__setattr__(self, _field_name(key), value)
+        # Interned IDs for the engine; the strings are kept for output
+        ids = (move_ids[d['name']], type_ids[d['type']],
+               category_ids[d['category']], status_ids[d['status']],
+               target_ids[d['status_target']], target_ids[d['stat_target']],
+               fixed_damage_id(d['fixed_damage']))
+        for field, value in zip(_ID_FIELDS, ids):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'MoveSpec {self.name} is read-only')
+
+    def __repr__(self):
+        return f'MoveSpec({self.name!r})'
+
+    # Copies and unpickled objects refer to the same shared spec
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (get_move_spec, (self.name,))
+
+
+move_specs = {name: MoveSpec(d) for name, d in globals.moves_dict.items()}
+
+
+def get_move_spec(name):
+    try:
+        return move_specs[name]
+    except KeyError:
+        raise KeyError(f'Move(): name = {name} not found!')
+
+
+class Move:
+    """
+    One move in a Pokemon's moveset: a reference to the shared MoveSpec, the
+    move's index in the moveset, and its current PP. All other attributes are
+    read from the spec.
+    """
+
+    __slots__ = ('spec', 'index', 'pp')
+
+    def __init__(self, name, index=STRUGGLE_INDEX):
+        self.spec = get_move_spec(name)
+        self.index = index
+        self.pp = self.spec.max_pp
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the Move itself
+        if name in Move.__slots__ or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.spec, name)
 
-    @property
-    def pp(self):
-        return self._pp
 
-    @pp.setter
-    def pp(self, val):
-        self._pp = val
+# Struggle never uses PP, so a single instance is shared by every Pokemon
+struggle = Move('Struggle')
@@ -1,7 +1,27 @@
 import globals
-from mediator import Colleague
-from ui import post_message
-import random
+from mediator import Colleague, HyperBeamKOEvent
+from rng import default_rng
+from typechart import chart, dual_chart, type_ids
+from damage import (screened_defense, scale_att_def, crit_threshold,
+                    base_damage)
+from eventlog import (ACCURACY, STATUS_CHANCE, STAT_CHANCE, CRIT, DAMAGE_ROLL,
+                      PSYWAVE, SLEEP_TURNS)
+from ids import (STRUGGLE_ID, HYPER_BEAM_ID, REST_ID, PHYSICAL, STATUS, STAT,
+                 DAMAGING, NO_STATUS, PRZ, BRN, FRZ, SLP, PSN, TXC, POISONED,
+                 OTHER, FD_LEVEL, FD_RANDOM, FD_HALF_CURRENT, FD_LAST_DAMAGE,
+                 FD_VALUE)
+
+ELECTRIC = type_ids['Electric']
+GROUND = type_ids['Ground']
+POISON = type_ids['Poison']
+
+# Which accuracy get_effective_accuracy computes
+DAMAGE_CHECK, STATUS_CHECK, STAT_CHECK = range(3)
+
+# Messages for a status move against a target that has a status
+already_messages = {PRZ: 'already_paralyzed', BRN: 'already_burned',
+                    FRZ: 'already_frozen', SLP: 'already_asleep',
+                    PSN: 'already_poisoned', TXC: 'already_poisoned'}
 
 
 class MoveUser(Colleague):
@@ -10,7 +30,8 @@ class MoveUser(Colleague):
     changes, and special effects of unique moves
     """
 
-    def __init__(self):
+    def __init__(self, rng=None):
+        self.rng = rng if rng else default_rng
         self.last_damage = 0
         self.trap_damage = 0
 
@@ -29,23 +50,26 @@ class MoveUser(Colleague):
             return
         '''
 
+        # Everything past the PP update only needs the shared move data
+        spec = move.spec
         # decrement move's PP
-        if move.name == 'Struggle':
-            post_message(f'{user.name} is out of PP!')
+        if spec.id == STRUGGLE_ID:
+            self.post('out_of_pp', user.name)
         else:
             move.pp -= 1
             user.add_seen_move(move)
-        post_message(f'{user.name} used {move.name}!')
+        self.post('used_move', user.name, move.name)
 
         # damaging moves
-        if move.category in ['Physical', 'Special']:
-            self.apply_direct_damage(move, user, other)
+        category = spec.category_id
+        if category in DAMAGING:
+            self.apply_direct_damage(spec, user, other)
         # status moves
-        elif move.category == 'Status':
-            self.apply_status(move, user, other)
+        elif category == STATUS:
+            self.apply_status(spec, user, other)
         # stat changing moves
-        elif move.category == 'Stat':
-            self.apply_stat_changes(move, user, other)
+        elif category == STAT:
+            self.apply_stat_changes(spec, user, other)
         # unique moves with special effects
         else:
             pass
@@ -53,27 +77,24 @@ class MoveUser(Colleague):
         user.last_used_move_index = self.get_move_index(move, user)
 
     def get_move_index(self, move, user):
-        i = 0
-        for i, m in enumerate(user.moves):
-            if m == move:
-                break
-        return i
+        return move.index
 
     def apply_direct_damage(self, move, user, other):
         # accuracy check
-        acc = self.get_effective_accuracy('Damage', move, user, other)
-        move_hits = globals.gen1_rng_check(acc)
+        acc = self.get_effective_accuracy(DAMAGE_CHECK, move, user, other)
+        move_hits = globals.gen1_rng_check(acc, self.rng)
+        self.rng.record(ACCURACY, move_hits)
         if not move_hits:
-            post_message('The move missed!')
+            self.post('missed')
             return
         # damage calculation
         damage = self.calc_damage(move, user, other)
         if damage != 0:
-            post_message(f'{other.name} took {damage} damage!')
+            self.post('took_damage', other.name, damage)
         other.current_hp -= damage
         # check for a Hyper Beam KO
-        if other.is_fainted() and move.name == 'Hyper Beam':
-            self.send_event({'event_type': 'hyper_beam_ko', 'pkmn': other})
+        if other.is_fainted() and move.id == HYPER_BEAM_ID:
+            self.send_event(HyperBeamKOEvent(other))
         # secondary status effects
         if move.status_accuracy:
             self.apply_status(move, user, other)
@@ -81,249 +102,245 @@ class MoveUser(Colleague):
         if move.stat_accuracy:
             self.apply_stat_changes(move, user, other)
 
-    def get_effective_accuracy(self, category, move, user, other):
+    def get_effective_accuracy(self, check, move, user, other):
         acc_mult = user.accuracy
         eva_mult = other.evasion
-        if category == 'Damage':
+        if check == DAMAGE_CHECK:
             base = move.accuracy
             if base == '-':
                 return base
             else:
                 return base*acc_mult*eva_mult
-        elif category == 'Stat':
+        elif check == STAT_CHECK:
             base = move.stat_accuracy
-            if move.category == 'Stat':
+            if move.category_id == STAT:
                 if base == '-':
                     return base
                 else:
                     return base*acc_mult*eva_mult
-            elif move.category in ['Physical', 'Special']:
+            elif move.category_id in DAMAGING:
                 return base
             else:
                 # weird combination
-                raise ValueError(f'Unexpected combination category={category},'
-                                 f' move.category={move.category}')
-        elif category == 'Status':
+                raise ValueError(f'Unexpected stat change from move.category='
+                                 f'{move.category}')
+        elif check == STATUS_CHECK:
             base = move.status_accuracy
-            if move.category == 'Status':
+            if move.category_id == STATUS:
                 if base == '-':
                     return base
                 else:
                     return base*acc_mult*eva_mult
-            elif move.category in ['Physical', 'Special']:
+            elif move.category_id in DAMAGING:
                 return base
             else:
                 # weird combination
-                raise ValueError(f'Unexpected combination category={category},'
-                                 f' move.category={move.category}')
+                raise ValueError(f'Unexpected status from move.category='
+                                 f'{move.category}')
         else:
-            raise ValueError(f'Unexpected category {category}')
+            raise ValueError(f'Unexpected accuracy check {check}')
 
     def get_effective_att_def(self, move, user, target, crit):
         # Determine effective att/def stats
-        if move.category == 'Physical':
+        if move.category_id == PHYSICAL:
             if crit:
-                a = user.stats.stats_l[1].calculate_stat(crit=True)
-                d = target.stats.stats_l[2].calculate_stat(crit=True)
+                a = user.stats.calculate_stat(1, crit=True)
+                d = target.stats.calculate_stat(2, crit=True)
             else:
                 a = user.attack
                 d = target.defense
                 if target.sm.get_flag('reflect'):
-                    d *= 2
-                    if d > 1024:
-                        d = d % 1024
+                    d = screened_defense(d)
         else:
             if crit:
-                a = user.stats.stats_l[4].calculate_stat(crit=True)
-                d = target.stats.stats_l[4].calculate_stat(crit=True)
+                a = user.stats.calculate_stat(4, crit=True)
+                d = target.stats.calculate_stat(4, crit=True)
             else:
                 a = user.special
                 d = target.special
                 if target.sm.get_flag('lightscreen'):
-                    d *= 2
-                    if d > 1024:
-                        d = d % 1024
-        if a > 255 or d > 255:
-            a = a//4
-            d = d//4
-        return (a, d)
+                    d = screened_defense(d)
+        return scale_att_def(a, d)
 
     def calc_damage(self, move, user, target):
         # return 10   # for testing
 
         # First check for a critical hit, because this affects stat values
-        crit = random.randrange(256) < self.crit_rng_threshold(user, move)
-        crit_mult = 2 if crit else 1
+        crit = self.rng.byte() < self.crit_rng_threshold(user, move)
+        self.rng.record(CRIT, crit)
         if crit:
-            post_message('Critical hit!')
+            self.post('critical_hit')
         a, d = self.get_effective_att_def(move, user, target, crit)
         raw_power = move.base_power
         if raw_power == '-':
-            # Note 3/2/26 -- this will fail for OHKO moves
+            if move.ohko:
+                return self.get_ohko_damage(move, user, target)
             return self.get_fixed_damage(move, user, target)
         else:
             power = raw_power
-        base_damage = int((2*user.level*crit_mult/5 + 2)*power*a/(d*50) + 2)
         # Apply type-dependent multipliers
         stab = 1
-        if move.type in [user.type1, user.type2]:
+        if move.type_id in user.type_ids:
             stab = 1.5
-        type1 = globals.get_type_mult(move.type, target.type1)
-        type2 = globals.get_type_mult(move.type, target.type2)
+        t1, t2 = target.type_ids
+        type1 = chart[move.type_id][t1]
+        type2 = chart[move.type_id][t2]
         if (type1*type2) > 1:
-            post_message('It\'s super effective!')
+            self.post('super_effective')
         if (type1*type2) > 0 and (type1*type2) < 1:
-            post_message('It\'s not very effective...')
+            self.post('not_very_effective')
         if (type1*type2) == 0:
-            post_message('It has no effect...')
-        damage = int(base_damage*stab)
-        damage = int(damage*type1)
-        damage = int(damage*type2)
+            self.post('no_effect')
+        damage = base_damage(user.level, power, a, d, stab, type1, type2, crit)
         # Apply random variation
         if damage == 1:
             rand_mult = 255
         else:
-            rand_mult = random.randrange(217, 256)
+            rand_mult = self.rng.damage_roll()
+            self.rng.record(DAMAGE_ROLL, rand_mult)
         damage = damage * rand_mult // 255
         # Finally check if damage exceeds target's HP
         damage = min(damage, target.current_hp)
         return damage
 
     def crit_rng_threshold(self, user, move):
-        spe = user.base_spe
-        thresh = spe//2
-        if move.high_crit:
-            thresh = min(move.high_crit*thresh, 255)
-        return thresh
+        return crit_threshold(user.base_spe, move.high_crit)
+
+    def get_ohko_damage(self, move, user, target):
+        """
+        Damage for Fissure, Guillotine and Horn Drill. These moves fail against
+        a faster target, and respect type immunities.
+        """
+        t1, t2 = target.type_ids
+        if dual_chart[move.type_id][t1][t2] == 0:
+            self.post('no_effect')
+            return 0
+        if user.speed < target.speed:
+            self.post('move_failed')
+            return 0
+        self.post('ohko')
+        return target.current_hp
 
     def get_fixed_damage(self, move, user, target):
         # return min(10, target.current_hp)   # for testing
-        fd_type = move.fixed_damage
+        fd_type = move.fixed_damage_id
         if not fd_type:
             raise ValueError(f'get_fixed_damage called for move {move.name} '
                              f'with no fixed_damage attribute')
         dmg = 0
-        if fd_type == 'level':
+        if fd_type == FD_LEVEL:
             # Night Shade and Seismic Toss
             dmg = user.level
-        elif fd_type == 'random':
+        elif fd_type == FD_RANDOM:
             # Psywave
-            dmg = random.randrange(1, int(1.5*user.level + 1))
-        elif fd_type == 'half_current':
+            dmg = self.rng.randrange(1, int(1.5*user.level + 1))
+            self.rng.record(PSYWAVE, dmg)
+        elif fd_type == FD_HALF_CURRENT:
             # Super Fang
             dmg = target.current_hp // 2
-        elif fd_type == 'last_damage':
+        elif fd_type == FD_LAST_DAMAGE:
             # Counter
             # Need to implement (remember Ghost is immune)
             pass
-        else:
+        elif fd_type == FD_VALUE:
             # Dragon Rage and SonicBoom
-            dmg = fd_type
+            dmg = move.fixed_damage
         return min(dmg, target.current_hp)
 
     def proc_status(self, move, target):
-        target.sm.status = move.status
-        message = f'{target.name} '
-        if move.status == 'PRZ':
-            message += 'became paralyzed!'
+        status = move.status_id
+        target.sm.status_id = status
+        if status == PRZ:
+            msg_id = 'paralyzed'
             # target.prz_flag = True
             # target.recalc_stats()
             target.stats.apply_status_debuff()
-        elif move.status == 'BRN':
-            message += 'was burned!'
+        elif status == BRN:
+            msg_id = 'burned'
             # target.brn_flag = True
             # target.recalc_stats()
             target.stats.apply_status_debuff()
-        elif move.status == 'FRZ':
-            message += 'was frozen solid!'
-        elif move.status == 'SLP':
-            if move.name == 'Rest':
-                message += 'fell asleep and became healthy!'
+        elif status == FRZ:
+            msg_id = 'frozen'
+        elif status == SLP:
+            if move.id == REST_ID:
+                msg_id = 'rested'
                 target.current_hp = target.max_hp
                 turns = 2
             else:
-                message += 'fell asleep!'
-                turns = globals.sleep_turns()
+                msg_id = 'fell_asleep'
+                turns = globals.sleep_turns(self.rng)
+                self.rng.record(SLEEP_TURNS, turns)
             target.sm.turn_on_counter('sleep', turns)
-        elif move.status == 'PSN':
-            message += 'was poisoned!'
-        elif move.status == 'TXC':
-            message += 'was badly poisoned!'
+        elif status == PSN:
+            msg_id = 'poisoned'
+        elif status == TXC:
+            msg_id = 'badly_poisoned'
             target.sm.turn_on_counter('toxic', 1)
         else:
             raise ValueError(f'Move {move.name} with invalid status '
                              f'{move.status}')
-        return message
+        return msg_id
 
     def apply_status(self, move, user, other):
-        target = other if move.status_target == 'other' else user
+        target = other if move.status_target_id == OTHER else user
         # Pokemon cannot be status'd by the secondary effect of a damaging
         # move of their own type
-        if (move.category in ['Physical', 'Special'] and
-                move.type in [target.type1, target.type2]):
+        if (move.category_id in DAMAGING and
+                move.type_id in target.type_ids):
             return
         # Ground Pokemon can't be paralyzed by Electric moves
-        if (move.type == 'Electric' and
-                'Ground' in [target.type1, target.type2]):
+        if move.type_id == ELECTRIC and GROUND in target.type_ids:
             return
         # Poison Pokemon can't be poisoned (or toxic'd)
-        if (move.status in ['PSN', 'TXC'] and
-                'Poison' in [target.type1, target.type2]):
-            if move.category == 'Status':
-                post_message('The move has no effect!')
+        if move.status_id & POISONED and POISON in target.type_ids:
+            if move.category_id == STATUS:
+                self.post('move_no_effect')
             return
         # Don't apply a new status if the target already has one, except Rest
         # and unfreezing when hit by a fire move capable of causing BRN
-        if target.sm.status:
+        if target.sm.status_id:
             self.attempt_status_overwrite(move, target)
         else:
             # target doesn't already have a status, so proceed normally
             # accuracy check
-            acc = self.get_effective_accuracy('Status', move, user, other)
-            move_hits = globals.rng_check(acc)
+            acc = self.get_effective_accuracy(STATUS_CHECK, move, user, other)
+            move_hits = globals.rng_check(acc, self.rng)
+            self.rng.record(STATUS_CHANCE, move_hits)
             if move_hits:
-                message = self.proc_status(move, target)
-                post_message(message)
+                self.post(self.proc_status(move, target), target.name)
             else:
-                if move.category == 'Status':
-                    post_message('The move missed!')
+                if move.category_id == STATUS:
+                    self.post('missed')
 
     def attempt_status_overwrite(self, move, target):
         # if status is a side effect, check for unfreezing
-        if move.category != 'Status':
-            if target.sm.status == 'FRZ' and move.status == 'BRN':
-                target.sm.status = None
-                post_message(f'{target.name} was thawed!')
+        if move.category_id != STATUS:
+            if target.sm.status_id == FRZ and move.status_id == BRN:
+                target.sm.status_id = NO_STATUS
+                self.post('thawed', target.name)
         # otherwise, print a move failure message
         else:
             # the exception is the move Rest, which overwrites status
-            if move.name != 'Rest':
-                message = f'{target.name} is already '
-                if target.sm.status == 'PRZ':
-                    message += 'paralyzed!'
-                if target.sm.status == 'BRN':
-                    message += 'burned!'
-                if target.sm.status == 'FRZ':
-                    message += 'frozen!'
-                if target.sm.status == 'SLP':
-                    message += 'asleep!'
-                if target.sm.status in ['PSN', 'TXC']:
-                    message += 'poisoned!'
+            if move.id != REST_ID:
+                msg_id = already_messages.get(target.sm.status_id,
+                                              'move_failed')
             else:
                 # Rest special case
                 if target.current_hp < target.max_hp:
-                    message = self.proc_status(move, target)
+                    msg_id = self.proc_status(move, target)
                 else:
-                    message = 'The move failed!'
-            post_message(message)
+                    msg_id = 'move_failed'
+            self.post(msg_id, target.name)
             return
 
     def apply_stat_changes(self, move, user, other):
         # accuracy check
-        acc = self.get_effective_accuracy('Stat', move, user, other)
-        move_hits = globals.rng_check(acc)
+        acc = self.get_effective_accuracy(STAT_CHECK, move, user, other)
+        move_hits = globals.rng_check(acc, self.rng)
+        self.rng.record(STAT_CHANCE, move_hits)
         if move_hits:
-            target = other if move.stat_target == 'other' else user
+            target = other if move.stat_target_id == OTHER else user
             if not target.stats.can_change(move.stat_index, move.stat_delta):
                 # Change is not possible
                 message = target.stats.get_bad_change_message(move.stat_index)
@@ -338,11 +355,8 @@ class MoveUser(Colleague):
                                                             move.stat_delta)
                 # Reapply prz/brn debuff to other, if applicable
                 other.stats.apply_status_debuff()
-            post_message(message)
+            self.post(*message)
 
         else:
-            if move.category == 'Stat':
-                post_message('The move missed!')
-
-    def receive_event(self, event_d):
-        pass
+            if move.category_id == STAT:
+                self.post('missed')
@@ -1,36 +1,46 @@
 import globals
-from mediator import Colleague
+from mediator import Colleague, FaintEvent, SwapEvent, HyperBeamKOEvent
 from statusmanager import StatusManager
 from stats import Stats
 from move import Move
+from typechart import type_ids
+from ids import species_ids, FNT
 from ui import post_message
+from rng import default_rng
 import sys
-import random
 
 
 class Pokemon(Colleague):
     """
     Define characteristics of a Pokemon, including name, type(s),
-    stats, moveset, and level
+    stats, moveset, and level. Species data is shared with globals rather than
+    copied onto each Pokemon.
     """
 
-    def __init__(self, name, moves='random', level=None):
+    __slots__ = ('_species', '_level', 'species_id', 'type_ids', 'sm',
+                 'stats', '_current_hp', 'moves', 'seen_moves',
+                 '_last_used_move_index')
+
+    event_handlers = {FaintEvent: '_process_faint_event',
+                      SwapEvent: '_process_swap_event',
+                      HyperBeamKOEvent: '_process_hyper_beam_ko_event'}
+
+    def __init__(self, name, moves='random', level=None, rng=None):
         super().__init__()
-        d = globals.get_species_dict(name)
-        for key, value in d.items():
-            setattr(self, key, value)
+        self._species = globals.get_species_dict(name)
         self._level = level if level else self.randomizer_level
+        # Integer IDs for the engine (see ids and typechart)
+        self.species_id = species_ids[name]
+        self.type_ids = (type_ids[self.type1], type_ids[self.type2])
         # Non-volatile status needed before calculating stats (BRN/PRZ debuff)
         self.sm = StatusManager(self)
         # Main in-battle stats
         self.stats = Stats(self)
         self._current_hp = self.max_hp
         # Moveset
-        self.moves = self._init_moves(moves)
+        self.moves = self._init_moves(moves, rng if rng else default_rng)
         self.seen_moves = set()
         self._last_used_move_index = -1
-        # Text UI printing
-        self._printer = PkmnPrinter(self)
 
     def is_fainted(self):
         if self.current_hp == 0:
@@ -46,21 +56,61 @@ class Pokemon(Colleague):
     def current_hp(self, val):
         if val <= 0:
             self._current_hp = 0
-            self.sm.status = 'FNT'
-            post_message(f'{self.name} fainted!')
-            self.send_event({'event_type': 'faint', 'pkmn': self})
+            self.sm.status_id = FNT
+            self.post('fainted', self.name)
+            self.send_event(FaintEvent(self))
         elif val > self.max_hp:
             self._current_hp = self.max_hp
         else:
             self._current_hp = val
 
+    @property
+    def name(self):
+        return self._species['name']
+
+    @property
+    def type1(self):
+        return self._species['type1']
+
+    @property
+    def type2(self):
+        return self._species['type2']
+
+    @property
+    def base_hp(self):
+        return self._species['base_hp']
+
+    @property
+    def base_att(self):
+        return self._species['base_att']
+
+    @property
+    def base_def(self):
+        return self._species['base_def']
+
+    @property
+    def base_spe(self):
+        return self._species['base_spe']
+
+    @property
+    def base_spc(self):
+        return self._species['base_spc']
+
+    @property
+    def randomizer_level(self):
+        return self._species['randomizer_level']
+
+    @property
+    def movepool(self):
+        return self._species['movepool']
+
     @property
     def max_hp(self):
-        return self.stats[0]
+        return self.stats.max_hp
 
     @property
     def attack(self):
-        return self.stats[1]
+        return self.stats.attack
 
     # @attack.setter
     # def attack(self, val):
@@ -68,11 +118,11 @@ class Pokemon(Colleague):
 
     @property
     def defense(self):
-        return self.stats[2]
+        return self.stats.defense
 
     @property
     def speed(self):
-        return self.stats[3]
+        return self.stats.speed
 
     # @speed.setter
     # def speed(self, val):
@@ -80,15 +130,15 @@ class Pokemon(Colleague):
 
     @property
     def special(self):
-        return self.stats[4]
+        return self.stats.special
 
     @property
     def accuracy(self):
-        return self.stats[5]
+        return self.stats.accuracy
 
     @property
     def evasion(self):
-        return self.stats[6]
+        return self.stats.evasion
 
     @property
     def level(self):
@@ -105,6 +155,23 @@ class Pokemon(Colleague):
     def last_used_move_index(self, val):
         self._last_used_move_index = val
 
+    def snapshot(self):
+        """
+        Returns the Pokemon's mutable battle state as a tuple.
+        """
+        return (self._current_hp, tuple([move.pp for move in self.moves]),
+                frozenset(self.seen_moves), self._last_used_move_index,
+                self.stats.snapshot(), self.sm.snapshot())
+
+    def restore(self, state):
+        (self._current_hp, pps, seen_moves, self._last_used_move_index,
+         stats, sm) = state
+        for move, pp in zip(self.moves, pps):
+            move.pp = pp
+        self.seen_moves = set(seen_moves)
+        self.stats.restore(stats)
+        self.sm.restore(sm)
+
     def retreat(self):
         """
         Resets stat stages and status flags when Pokemon swaps out.
@@ -113,25 +180,24 @@ class Pokemon(Colleague):
         self.sm.retreat()
         self.stats.recalculate_all()
 
-    def receive_event(self, event_d):
-        if event_d['event_type'] == 'faint':
-            if event_d['pkmn'] != self:
-                self.sm.opponent_fainted()
-        elif event_d['event_type'] == 'swap':
-            if event_d['trainer'].active != self:
-                self.sm.opponent_swapped()
-        elif event_d['event_type'] == 'hyper_beam_ko':
-            if event_d['pkmn'] != self:
-                self.sm.hyper_beam_ko()
-        else:
-            pass
+    def _process_faint_event(self, event):
+        if event.pkmn != self:
+            self.sm.opponent_fainted()
 
-    def _init_moves(self, moves):
+    def _process_swap_event(self, event):
+        if event.trainer.active != self:
+            self.sm.opponent_swapped()
+
+    def _process_hyper_beam_ko_event(self, event):
+        if event.pkmn != self:
+            self.sm.hyper_beam_ko()
+
+    def _init_moves(self, moves, rng):
         if moves == 'random':
-            return self._randomize_moves()
+            return self._randomize_moves(rng)
         elif type(moves) == list:
             if len(moves) > 0 and len(moves) <= 4:
-                return [Move(move) for move in moves]
+                return [Move(move, i) for i, move in enumerate(moves)]
             else:
                 raise ValueError(f'Invalid starting move list {moves} -- '
                                  'must have between 1 and 4 moves')
@@ -139,41 +205,45 @@ class Pokemon(Colleague):
             raise ValueError(f'Invalid starting moves {moves}; should be list '
                              'or "random"')
 
-    def _randomize_moves(self):
+    def _randomize_moves(self, rng):
         moves = []
         try:
-            selected = random.sample(self.movepool, 4)
+            selected = rng.sample(self.movepool, 4)
         except ValueError:
             selected = self.movepool
-        for name in selected:
+        for i, name in enumerate(selected):
             try:
-                moves.append(Move(name))
+                moves.append(Move(name, i))
             except KeyError as e:
                 print(f'_randomize_moves(): name = {name} not found\n{e}')
                 sys.exit(1)
         return moves
 
     def print_status(self):
-        self._printer.print_status()
+        PkmnPrinter(self).print_status()
 
     def print_moves(self, indent=True, seen_moves=False):
-        return self._printer.print_moves(indent=indent, seen_moves=seen_moves)
+        return PkmnPrinter(self).print_moves(indent=indent,
+                                             seen_moves=seen_moves)
 
     def print_stats(self):
-        self._printer.print_stats()
+        PkmnPrinter(self).print_stats()
 
     def print(self, show_stats=False, newline=True,
               indent_moves=True, seen_moves=False):
-        self._printer.print(show_stats=show_stats, newline=newline,
-                            indent_moves=indent_moves, seen_moves=seen_moves)
+        PkmnPrinter(self).print(show_stats=show_stats, newline=newline,
+                                indent_moves=indent_moves,
+                                seen_moves=seen_moves)
 
 
 class PkmnPrinter:
     """
     Define functionality to print a Pokemon's overall status, stats, and move
-    set.
+    set. Created on demand, only when something is printed.
     """
 
+    __slots__ = ('_pkmn',)
+
     def __init__(self, pkmn):
         self._pkmn = pkmn
 
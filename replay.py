@@ -0,0 +1,119 @@
+"""
+Deterministic replay of logged battles. A battle's random outcomes only depend
+on its seed and the trainers' decisions, so re-running RoundManager.round from
+the seed with the logged decisions reproduces the battle exactly, with all
+output suppressed.
+"""
+
+from battle import Battle
+from ai import ScriptedAI
+from rng import RNG, BufferedRNG
+import eventlog
+
+
+class Replay:
+    """
+    Replays one battle from its seed and each trainer's list of actions
+    (('move', index) or ('swap', index), including swaps after a faint, in the
+    order they were made). Parties must match the original battle; 'random'
+    parties are regenerated from the seed.
+
+    After seek(turn), battle holds the state after that many rounds.
+    """
+
+    def __init__(self, seed, actions1, actions2, party1='random',
+                 party2='random', buffered=False, rounds=None):
+        self.seed = seed
+        self.actions1 = list(actions1)
+        self.actions2 = list(actions2)
+        self.party1 = party1
+        self.party2 = party2
+        self.buffered = buffered
+        # Number of rounds in the original battle, if known
+        self.rounds = rounds
+        self.battle = None
+        self.reset()
+
+    @classmethod
+    def from_records(cls, seed, buffered, records, party1='random',
+                     party2='random'):
+        """
+        Builds a Replay from one battle of EventLogReader.battles().
+        """
+        actions = {1: [], 2: []}
+        rounds = 0
+        for kind, side, value in records:
+            if kind == eventlog.ROUND:
+                rounds += 1
+            elif kind == eventlog.MOVE:
+                actions[side].append(('move', value))
+            elif kind in (eventlog.SWAP, eventlog.FAINT_SWAP):
+                actions[side].append(('swap', value))
+        return cls(seed, actions[1], actions[2], party1, party2, buffered,
+                   rounds)
+
+    @classmethod
+    def from_log(cls, path, index=0, party1='random', party2='random'):
+        """
+        Builds a Replay of the index-th battle in the event log at path.
+        """
+        with eventlog.EventLogReader(path) as reader:
+            for i, (seed, buffered, records) in enumerate(reader.battles()):
+                if i == index:
+                    return cls.from_records(seed, buffered, records, party1,
+                                            party2)
+        raise IndexError(f'Battle {index} not found in {path}')
+
+    @property
+    def turn(self):
+        return self.battle.round_no
+
+    def reset(self):
+        """
+        Rebuilds the battle in its initial state.
+        """
+        rng = BufferedRNG(self.seed) if self.buffered else RNG(self.seed)
+        bat = Battle(ui='none', trainer1_party=self.party1,
+                     trainer2_party=self.party2, trainer1_ai='random',
+                     trainer2_ai='random', rng=rng)
+        bat.trainer1.set_ai(ScriptedAI(bat.trainer1, bat.trainer2,
+                                       self.actions1))
+        bat.trainer2.set_ai(ScriptedAI(bat.trainer2, bat.trainer1,
+                                       self.actions2))
+        self.battle = bat
+
+    def step(self):
+        """
+        Plays one round. Returns False if the battle was already over.
+        """
+        if self.battle.is_over:
+            return False
+        if self.rounds is not None and self.turn >= self.rounds:
+            raise ValueError(f'The logged battle ended after {self.rounds} '
+                             'rounds')
+        self.battle.advance_round()
+        return True
+
+    def seek(self, turn):
+        """
+        Fast-forwards (or rewinds, by replaying from the start) to the state
+        after the given number of rounds, or to the end of the battle if it
+        ends sooner. Returns the Battle.
+        """
+        if turn < 0 or (self.rounds is not None and turn > self.rounds):
+            raise ValueError(f'Invalid turn {turn}')
+        if turn < self.turn:
+            self.reset()
+        while self.turn < turn and self.step():
+            pass
+        return self.battle
+
+    def run(self):
+        """
+        Plays the rest of the logged battle. Returns the Battle.
+        """
+        if self.rounds is not None:
+            return self.seek(self.rounds)
+        while self.step():
+            pass
+        return self.battle
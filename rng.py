@@ -0,0 +1,128 @@
+import hashlib
+import random
+
+# Number of values generated at once by BufferedRNG
+BLOCK_SIZE = 512
+
+# Range of the random damage multiplier (out of 255)
+MIN_DAMAGE_ROLL = 217
+MAX_DAMAGE_ROLL = 255
+
+
+def derive_seed(master_seed, index):
+    """
+    Derives a deterministic 64-bit seed from a master seed and an index (e.g.
+    a shard or battle number).
+    """
+    digest = hashlib.sha256(f'{master_seed}:{index}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+class RNG:
+    """
+    Source of all random draws for one battle. Wraps its own random.Random, so
+    battles seeded the same way play out the same way, independently of the
+    module-level random state and of any other battle.
+
+    If an eventlog.EventRecorder is attached as recorder, the battle logic
+    reports the outcome of each random check through record().
+    """
+
+    buffered = False
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self._random = random.Random(seed)
+        self.recorder = None
+
+    def spawn(self, key):
+        """
+        Returns a new RNG of the same kind, seeded from this RNG's seed and
+        key, for an independent stream of draws.
+        """
+        return self.__class__(derive_seed(self.seed, key),
+                              **self._spawn_kwargs())
+
+    def _spawn_kwargs(self):
+        """
+        Returns the constructor arguments besides the seed that spawn() passes
+        on to the new RNG.
+        """
+        return {}
+
+    def record(self, kind, value):
+        if self.recorder is not None:
+            self.recorder.outcome(kind, value)
+
+    def random(self):
+        """
+        Returns a float in [0, 1).
+        """
+        return self._random.random()
+
+    def randrange(self, start, stop=None):
+        return self._random.randrange(start, stop)
+
+    def sample(self, population, k):
+        return self._random.sample(population, k)
+
+    def byte(self):
+        """
+        Returns a Gen 1-style random byte in [0, 255].
+        """
+        return self._random.getrandbits(8)
+
+    def damage_roll(self):
+        """
+        Returns the random damage multiplier, in [217, 255].
+        """
+        return self._random.randrange(MIN_DAMAGE_ROLL, MAX_DAMAGE_ROLL+1)
+
+
+class BufferedRNG(RNG):
+    """
+    RNG that generates bytes and integer ranges in blocks of block_size
+    values, so that each draw is a single read from a pre-filled buffer.
+    Floats and samples are not buffered.
+    """
+
+    buffered = True
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        super().__init__(seed)
+        self._block_size = block_size
+        self._bytes = iter(())
+        self._ranges = {}
+
+    def _spawn_kwargs(self):
+        return {'block_size': self._block_size}
+
+    def byte(self):
+        try:
+            return next(self._bytes)
+        except StopIteration:
+            self._bytes = iter(self._random.randbytes(self._block_size))
+            return next(self._bytes)
+
+    def randrange(self, start, stop=None):
+        if stop is None:
+            start, stop = 0, start
+        key = (start, stop)
+        try:
+            return next(self._ranges[key])
+        except (KeyError, StopIteration):
+            if stop <= start:
+                raise ValueError(f'Empty range ({start}, {stop})')
+            block = self._random.choices(range(start, stop),
+                                         k=self._block_size)
+            self._ranges[key] = iter(block)
+            return next(self._ranges[key])
+
+    def damage_roll(self):
+        return self.randrange(MIN_DAMAGE_ROLL, MAX_DAMAGE_ROLL+1)
+
+
+# Fallback for objects created outside of a Battle
+default_rng = RNG()
@@ -1,42 +1,92 @@
 import globals
-from mediator import Colleague
-from move import Move
+from mediator import Colleague, FaintEvent
+from move import struggle, STRUGGLE_INDEX
+from trainer import DecisionRequest, ACTION, SWAP
 from moveuser import MoveUser
 from turnmanager import TurnManager
 from ui import post_message
+from rng import default_rng
+from eventlog import SPEED_TIE
 
 
 class RoundManager(Colleague):
     """
     Main class for advancing the battle one round at a time.
+
+    A round runs as a generator (play_round) that yields a DecisionRequest
+    whenever a trainer has to decide, and is sent the chosen action; round()
+    answers them with the trainers' AIs. A Pokemon that faints is replaced
+    once the turn (or the end of round effect) that knocked it out is over.
     """
 
-    def __init__(self, trainer1, trainer2):
+    event_handlers = {FaintEvent: '_process_faint_event'}
+
+    def __init__(self, trainer1, trainer2, rng=None):
         super().__init__()
         self.trainer1 = trainer1
         self.trainer2 = trainer2
-        self.mu = MoveUser()
-        self.tm = TurnManager(self.mu)
+        self.rng = rng if rng else default_rng
+        self.mu = MoveUser(self.rng)
+        self.tm = TurnManager(self.mu, self.rng)
         self._proceed = True
         self._apply_end_round = True
         self._end_round_pkmn = []
+        # Trainers whose active Pokemon fainted, in order
+        self._fainted = []
 
     def round(self):
         """
         Main function for advancing the battle by one round.
         """
+        self._answer(self.play_round())
+
+    def replace_fainted(self):
+        """
+        Sends out the replacements of fainted Pokemon that are still waiting
+        for one (e.g. the other trainer's, in a double KO), chosen by the
+        trainers' AIs.
+        """
+        self._answer(self._replace_fainted())
+
+    def _answer(self, play):
+        # Runs a generator of DecisionRequests with the trainers' AIs
+        try:
+            request = next(play)
+            while True:
+                request = play.send(request.trainer.decide(request.kind))
+        except StopIteration:
+            pass
 
+    def play_round(self):
+        """
+        Generator that plays one round, yielding a DecisionRequest for every
+        decision and expecting the chosen action to be sent back.
+        """
         self._proceed = True
+        # Pokemon that missed their turn in a round cut short by a faint skip
+        # their recurring damage, rather than taking it in a later round
+        self._end_round_pkmn = []
         self.print()
-        self.trainer1.update_action()
-        self.trainer2.update_action()
+        self.trainer1.set_action((yield DecisionRequest(
+            self.trainer1, self.trainer2, ACTION)))
+        self.trainer2.set_action((yield DecisionRequest(
+            self.trainer2, self.trainer1, ACTION)))
         first_trainer, second_trainer = self.get_turn_order()
         self.turn(first_trainer, first=True)
+        yield from self._replace_fainted()
         if not self._proceed:
             return
         self.turn(second_trainer, first=False)
+        yield from self._replace_fainted()
         if self._proceed:
             self.end_round()
+            yield from self._replace_fainted()
+
+    def _replace_fainted(self):
+        while self._fainted:
+            trainer = self._fainted.pop(0)
+            other = self._get_other_trainer(trainer)
+            trainer.faint_swap((yield DecisionRequest(trainer, other, SWAP)))
 
     def turn(self, trainer, first=False):
         """
@@ -45,6 +95,8 @@ class RoundManager(Colleague):
 
         self._proceed = True
         other_trainer = self._get_other_trainer(trainer)
+        if self.rng.recorder is not None:
+            self.rng.recorder.set_actor(trainer)
         action = trainer.next_action
         if action[0] == 'swap':
             trainer.swap(action[1])
@@ -61,23 +113,37 @@ class RoundManager(Colleague):
         else:
             raise ValueError(f'Invalid action type {action[0]}')
 
+    def snapshot(self):
+        return (self._proceed, tuple(self._end_round_pkmn),
+                self.tm.counter_last_damage, self.tm.trap_damage,
+                tuple(self._fainted))
+
+    def restore(self, state):
+        (self._proceed, end_round_pkmn, self.tm.counter_last_damage,
+         self.tm.trap_damage, fainted) = state
+        self._end_round_pkmn = list(end_round_pkmn)
+        self._fainted = list(fainted)
+
     def end_round(self):
         """
         Apply any Poison/Burn/Leech Seed damage that was skipped by a Pokemon
         missing its turn.
         """
         for pkmn in self._end_round_pkmn:
+            # A faint ends the round here too
+            if not self._proceed:
+                break
             affected = pkmn
             other = (self.trainer2.active if pkmn == self.trainer1.active
                      else self.trainer1.active)
             self.tm.apply_all_recurring_damage(affected, other)
         self._end_round_pkmn = []
 
-    def receive_event(self, event_d):
-        if event_d['event_type'] == 'faint':
-            self._proceed = False
-        else:
-            pass
+    def _process_faint_event(self, event):
+        self._proceed = False
+        for trainer in (self.trainer1, self.trainer2):
+            if event.pkmn is trainer.active and trainer.party_alive:
+                self._fainted.append(trainer)
 
     def print(self):
         if globals.UI == 'text':
@@ -98,6 +164,9 @@ class RoundManager(Colleague):
             first, second = self.trainer1, self.trainer2
         elif (a1[0] == 'move' and a2[0] == 'swap'):
             first, second = self.trainer2, self.trainer1
+        elif a1[0] == 'swap':
+            # Both swap; the indices are party slots, not moves
+            first, second = self._get_move_order()
         else:
             first, second = self._get_priority_order(a1, a2)
         return first, second
@@ -108,9 +177,9 @@ class RoundManager(Colleague):
         on move priority.
         Returns first_trainer, second_trainer.
         """
-        m1 = self.trainer1.active.moves[a1[1]]
-        m2 = self.trainer2.active.moves[a2[1]]
-        p1, p2 = m1.priority, m2.priority
+        m1 = self._get_move(self.trainer1.active, a1[1])
+        m2 = self._get_move(self.trainer2.active, a2[1])
+        p1, p2 = m1.spec.priority, m2.spec.priority
         if p1 > p2:
             first, second = self.trainer1, self.trainer2
         elif p1 < p2:
@@ -131,7 +200,9 @@ class RoundManager(Colleague):
             first, second = self.trainer2, self.trainer1
         else:
             # Speed tie -- decide by a coin flip
-            if globals.rng_check(50):
+            t1_first = globals.rng_check(50, self.rng)
+            self.rng.record(SPEED_TIE, t1_first)
+            if t1_first:
                 first, second = self.trainer1, self.trainer2
             else:
                 first, second = self.trainer2, self.trainer1
@@ -141,8 +212,8 @@ class RoundManager(Colleague):
         return self.trainer2 if trainer == self.trainer1 else self.trainer1
 
     def _get_move(self, pkmn, index):
-        if index == 4:
-            move = Move('Struggle')
+        if index == STRUGGLE_INDEX:
+            move = struggle
         else:
             move = pkmn.moves[index]
         return move
@@ -0,0 +1,105 @@
+"""
+Runs many battles interleaved, answering all of their pending decisions with
+one batched policy call. Every battle runs as a generator (Battle.play); the
+scheduler advances each one to its next decision, and then passes all the
+DecisionRequests to the policy at once, e.g. a NumPy heuristic such as
+power_policy.
+"""
+
+from trainer import ACTION
+from typechart import as_arrays
+from ids import PHYSICAL
+
+
+def run_batched(battles, policy, max_rounds=None):
+    """
+    Plays headless battles to the end, interleaved. policy(requests) is
+    called with the list of pending trainer.DecisionRequests (at most one per
+    battle) and returns the chosen actions, in the same order. Returns the
+    number of rounds played in each battle.
+    """
+    games = [bat.play(max_rounds) for bat in battles]
+    rounds = [0]*len(battles)
+    pending = {}
+
+    def advance(i, action):
+        try:
+            pending[i] = games[i].send(action)
+        except StopIteration as stop:
+            rounds[i] = stop.value
+            pending.pop(i, None)
+
+    for i in range(len(games)):
+        advance(i, None)
+    while pending:
+        indices = list(pending)
+        actions = policy([pending[i] for i in indices])
+        for i, action in zip(indices, actions):
+            advance(i, action)
+    return rounds
+
+
+def ai_policy(requests):
+    """
+    Answers every request with the trainer's own AI, one at a time.
+    """
+    return [request.trainer.decide(request.kind) for request in requests]
+
+
+def power_policy(requests):
+    """
+    Batched heuristic: picks the legal move with the highest base power times
+    STAB, type multiplier and attack/defense ratio (moves without a base
+    power score 0), evaluated for all action requests at once with NumPy.
+    After a faint it sends out the healthiest Pokemon.
+    """
+    import numpy as np
+    actions = [None]*len(requests)
+    # Features of up to 4 moves for every request that needs scoring
+    scored = []
+    power, stab, ratio, types, targets, legal_mask = [], [], [], [], [], []
+    for i, request in enumerate(requests):
+        legal = request.legal
+        if request.kind != ACTION:
+            party = request.trainer.party
+            actions[i] = max(legal, key=lambda action: (
+                party[action[1]].current_hp/party[action[1]].max_hp))
+            continue
+        moves = [action for action in legal if action[0] == 'move']
+        pkmn, target = request.trainer.active, request.other.active
+        if len(moves) == 1:
+            actions[i] = moves[0]
+            continue
+        scored.append(i)
+        row_power, row_stab, row_ratio, row_types = [], [], [], []
+        legal_slots = {action[1] for action in moves}
+        for slot in range(4):
+            move = pkmn.moves[slot] if slot < len(pkmn.moves) else None
+            if move is None or move.spec.base_power == '-':
+                row_power.append(0)
+            else:
+                row_power.append(move.spec.base_power)
+            spec = move.spec if move is not None else None
+            row_types.append(spec.type_id if spec is not None else 0)
+            row_stab.append(1.5 if spec is not None
+                            and spec.type_id in pkmn.type_ids else 1)
+            if spec is not None and spec.category_id == PHYSICAL:
+                row_ratio.append(pkmn.attack/target.defense)
+            else:
+                row_ratio.append(pkmn.special/target.special)
+        power.append(row_power)
+        stab.append(row_stab)
+        ratio.append(row_ratio)
+        types.append(row_types)
+        targets.append(target.type_ids)
+        legal_mask.append([slot in legal_slots for slot in range(4)])
+    if scored:
+        dual = as_arrays()[1]
+        targets = np.array(targets)
+        mult = dual[np.array(types), targets[:, :1], targets[:, 1:]]
+        score = (np.array(power, dtype=np.float64)*np.array(stab)
+                 * np.array(ratio)*mult)
+        score[~np.array(legal_mask)] = -np.inf
+        for i, slot in zip(scored, score.argmax(axis=1)):
+            actions[i] = ('move', int(slot))
+    return actions
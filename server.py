@@ -0,0 +1,441 @@
+"""
+Asyncio server that hosts many battles at once in a single thread. Clients
+(humans behind a frontend, or bots) connect over TCP and speak a
+line-delimited JSON protocol; every line is one JSON object with a 'type'.
+
+The client starts with
+
+    {"type": "join", "name": ..., "party": <party>, "opponent": <opponent>,
+     "opponent_party": <party>, "seed": <int>}
+
+where a party uses the Trainer format ({species: [level, moves]}, or
+"random", the default) and opponent is an AI type ("random", the default,
+"greedy", "mcts") or "client" to be paired with the next client that asks
+for one. The server then sends
+
+    {"type": "start", "battle": <int>, "trainer": 1 or 2, "opponent": ...}
+    {"type": "message", "id": <message ID>, "args": [...], "text": ...}
+    {"type": "request", "request": <int>, "kind": "action" or "swap",
+     "timeout": <seconds>, "state": {...}}
+    {"type": "end", "winner": 1, 2, 0 (draw) or null, "rounds": <int>}
+
+and the client answers each request with
+
+    {"type": "action", "request": <int>, "action": ["move", i] or
+     ["swap", i]}
+
+using the legal actions listed in the request's state. A request that is
+not answered in time (or after the client disconnects) is decided by a
+RandomAI. Invalid answers get {"type": "error", "message": ...}.
+
+The engine itself is synchronous: every battle runs as a generator
+(Battle.play) that stops at each decision, and is resumed once the client
+has answered. Two clients are asked for their actions at the same time.
+
+Run it with python server.py (see --help).
+"""
+
+import globals
+from ai import RandomAI
+from battle import Battle
+from messages import render
+from rng import RNG
+from trainer import DecisionRequest, ACTION
+from ui import StructuredSink
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import itertools
+import json
+
+HOST = '127.0.0.1'
+PORT = 8765
+# Seconds a client has to answer a request
+DECISION_TIMEOUT = 30.0
+MAX_ROUNDS = 1000
+MAX_LEVEL = 100
+BOT_AIS = ('random', 'greedy', 'mcts')
+# Bot AIs that search for their whole time budget. Their decisions run in
+# a worker thread, so that they do not stall the other battles; the search
+# is pure Python and holds the GIL, so more threads would not search any
+# faster and would only slow the event loop down.
+THREADED_AIS = ('mcts',)
+SEARCH_THREADS = 1
+_search_executor = None
+
+
+def search_executor():
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = ThreadPoolExecutor(SEARCH_THREADS)
+    return _search_executor
+
+
+class Client:
+    """
+    One connection: sends JSON lines, and reads the answers to requests.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.connected = True
+        # Set once the client has hung up
+        self.disconnected = asyncio.Event()
+        self._requests = itertools.count(1)
+        self._request = None
+        self._answer = None
+
+    async def send(self, obj):
+        if not self.connected:
+            return
+        try:
+            self.writer.write(json.dumps(obj).encode() + b'\n')
+            await self.writer.drain()
+        except ConnectionError:
+            self.connected = False
+
+    async def receive(self):
+        """
+        Returns the next JSON object from the client, or None once it has
+        disconnected. Lines that are not JSON objects get an error.
+        """
+        while self.connected:
+            try:
+                line = await self.reader.readline()
+            except ConnectionError:
+                line = b''
+            if not line:
+                self.connected = False
+                self.disconnected.set()
+                break
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                obj = None
+            if isinstance(obj, dict):
+                return obj
+            await self.send({'type': 'error', 'message': 'Invalid JSON'})
+        if self._answer is not None and not self._answer.done():
+            self._answer.set_result(None)
+        return None
+
+    async def listen(self):
+        """
+        Passes answers to the pending request until the client disconnects.
+        """
+        while (obj := await self.receive()) is not None:
+            if (obj.get('type') != 'action' or self._answer is None
+                    or self._answer.done()
+                    or obj.get('request') != self._request):
+                await self.send({'type': 'error',
+                                 'message': 'Unexpected message'})
+                continue
+            self._answer.set_result(obj.get('action'))
+
+    async def request(self, kind, state, legal, timeout):
+        """
+        Asks for a decision and returns a legal action, or None if there is
+        no valid answer in time.
+        """
+        if not self.connected:
+            return None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._request = next(self._requests)
+        await self.send({'type': 'request', 'request': self._request,
+                         'kind': kind, 'timeout': timeout, 'state': state})
+        while self.connected:
+            self._answer = loop.create_future()
+            try:
+                action = await asyncio.wait_for(
+                    self._answer, max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return None
+            if action is None:
+                return None
+            if (isinstance(action, list) and len(action) == 2
+                    and tuple(action) in legal):
+                return tuple(action)
+            await self.send({'type': 'error',
+                             'message': f'Illegal action {action}'})
+        return None
+
+    async def close(self):
+        self.connected = False
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class Seat:
+    """
+    One trainer of a hosted battle, played by a client or a server-side AI.
+    """
+
+    def __init__(self, battle, trainer, other, client=None, ai='random'):
+        self.trainer = trainer
+        self.other = other
+        self.client = client
+        self.threaded = client is None and ai in THREADED_AIS
+        self.fallback = RandomAI(trainer, other,
+                                 battle.rng.spawn(f'fallback {trainer.name}'))
+
+    async def decide(self, request, timeout):
+        """
+        Returns the client's decision for a DecisionRequest, or the
+        fallback's if there is no valid answer in time.
+        """
+        legal = request.legal
+        if len(legal) == 1:
+            # Forced, e.g. a multiturn move or the last Pokemon standing
+            return legal[0]
+        action = await self.client.request(
+            request.kind, state(self.trainer, self.other, legal), set(legal),
+            timeout)
+        if action is None:
+            action = (self.fallback.get_action() if request.kind == ACTION
+                      else self.fallback.get_swap())
+        return action
+
+
+def check_party_entry(species, entry):
+    """
+    Returns why a party entry from a client is invalid, or None if it is a
+    known species with [level, moves], a level in 1..MAX_LEVEL and moves a
+    list of 1 to 4 known moves or "random".
+    """
+    if species not in globals.species_dict:
+        return f'unknown species {species}'
+    if not isinstance(entry, list) or len(entry) != 2:
+        return f'{species} should be [level, moves]'
+    level, moves = entry
+    if (not isinstance(level, int) or isinstance(level, bool)
+            or not 1 <= level <= MAX_LEVEL):
+        return f'invalid level {level} for {species}'
+    if moves == 'random':
+        return None
+    if not isinstance(moves, list) or not 1 <= len(moves) <= 4:
+        return f'{species} should have 1 to 4 moves or "random"'
+    for move in moves:
+        if not isinstance(move, str) or move not in globals.moves_dict:
+            return f'unknown move {move}'
+    return None
+
+
+def pokemon_state(pkmn):
+    return {'name': pkmn.name, 'level': pkmn.level, 'hp': pkmn.current_hp,
+            'max_hp': pkmn.max_hp, 'status': pkmn.sm.status}
+
+
+def state(trainer, other, legal):
+    """
+    Returns what a trainer's client needs to decide: its party, its active
+    Pokemon's moves, the opponent's active Pokemon, and the legal actions.
+    """
+    active = pokemon_state(trainer.active)
+    active['moves'] = [{'name': move.name, 'pp': move.pp,
+                        'max_pp': move.max_pp}
+                       for move in trainer.active.moves]
+    return {'active': active,
+            'active_index': trainer.party.index(trainer.active),
+            'party': [pokemon_state(pkmn) for pkmn in trainer.party],
+            'opponent': pokemon_state(other.active),
+            'legal': [list(action) for action in legal]}
+
+
+class HostedBattle:
+    """
+    A Battle played round by round between two seats, with its messages
+    sent to the clients.
+    """
+
+    def __init__(self, number, party1, party2, client1=None, client2=None,
+                 ai1='random', ai2='random', seed=None,
+                 timeout=DECISION_TIMEOUT, max_rounds=MAX_ROUNDS):
+        self.number = number
+        self.timeout = timeout
+        self.max_rounds = max_rounds
+        self.sink = StructuredSink()
+        self.battle = Battle(ui='none', trainer1_party=party1,
+                             trainer2_party=party2,
+                             trainer1_ai='random' if client1 else ai1,
+                             trainer2_ai='random' if client2 else ai2,
+                             rng=RNG(seed), sink=self.sink)
+        bat = self.battle
+        self.seats = (Seat(bat, bat.trainer1, bat.trainer2, client1, ai1),
+                      Seat(bat, bat.trainer2, bat.trainer1, client2, ai2))
+        self.clients = [client for client in (client1, client2) if client]
+
+    async def run(self):
+        bat = self.battle
+        for i, seat in enumerate(self.seats):
+            if seat.client is not None:
+                other = self.seats[1 - i]
+                await seat.client.send({
+                    'type': 'start', 'battle': self.number, 'trainer': i + 1,
+                    'opponent': 'client' if other.client else 'ai'})
+        play = bat.play(self.max_rounds)
+        # Trainer 2's action, asked for at the same time as trainer 1's
+        prefetched = None
+        action = None
+        while True:
+            # Other battles run in between, so claim the global UI type
+            globals.UI = 'none'
+            try:
+                request = play.send(action)
+            except StopIteration as stop:
+                rounds = stop.value
+                break
+            seat = self.seats[request.trainer is bat.trainer2]
+            if seat.threaded:
+                action = await asyncio.get_running_loop().run_in_executor(
+                    search_executor(), request.trainer.decide, request.kind)
+            elif seat.client is None:
+                action = request.trainer.decide(request.kind)
+            await self._deliver()
+            if seat.client is None:
+                continue
+            if prefetched is not None and request.kind == ACTION:
+                action = await prefetched
+                prefetched = None
+            else:
+                if (request.kind == ACTION and seat is self.seats[0]
+                        and self.seats[1].client is not None):
+                    prefetched = asyncio.ensure_future(self.seats[1].decide(
+                        DecisionRequest(bat.trainer2, bat.trainer1, ACTION),
+                        self.timeout))
+                action = await seat.decide(request, self.timeout)
+        await self._deliver()
+        for client in self.clients:
+            await client.send({'type': 'end', 'winner': bat.winner,
+                               'rounds': rounds})
+        return bat.winner
+
+    async def _deliver(self):
+        events = self.sink.events
+        for msg_id, args in events:
+            message = {'type': 'message', 'id': msg_id, 'args': list(args),
+                       'text': render(msg_id, args)}
+            for client in self.clients:
+                await client.send(message)
+        del events[:]
+
+
+class BattleServer:
+    """
+    Accepts clients and hosts a battle for each (pair of) them.
+    """
+
+    def __init__(self, timeout=DECISION_TIMEOUT, max_rounds=MAX_ROUNDS):
+        self.timeout = timeout
+        self.max_rounds = max_rounds
+        self.battles = {}
+        self._numbers = itertools.count(1)
+        # A client waiting for another client, with its join message
+        self._waiting = None
+
+    async def handle(self, reader, writer):
+        client = Client(reader, writer)
+        listener = None
+        try:
+            join = await client.receive()
+            if join is None:
+                return
+            error = self._check_join(join)
+            if error:
+                await client.send({'type': 'error', 'message': error})
+                return
+            listener = asyncio.create_task(client.listen())
+            if join.get('opponent', 'random') == 'client':
+                await self._pair(client, join)
+            else:
+                await self._host(client, None, join, {
+                    'party': join.get('opponent_party', 'random'),
+                    'ai': join.get('opponent', 'random')})
+        finally:
+            if listener is not None:
+                listener.cancel()
+            await client.close()
+
+    def _check_join(self, join):
+        if join.get('type') != 'join':
+            return 'Expected a join message'
+        opponent = join.get('opponent', 'random')
+        if opponent != 'client' and opponent not in BOT_AIS:
+            return f'Invalid opponent {opponent}'
+        for key in ('party', 'opponent_party'):
+            party = join.get(key, 'random')
+            if party != 'random' and (not isinstance(party, dict)
+                                      or not party):
+                return f'Invalid {key} {party}'
+            if party != 'random':
+                for species, entry in party.items():
+                    error = check_party_entry(species, entry)
+                    if error:
+                        return f'Invalid {key}: {error}'
+        return None
+
+    async def _pair(self, client, join):
+        if self._waiting is not None and not self._waiting[0].connected:
+            # Release a waiting client that hung up
+            self._waiting[2].set_result(None)
+            self._waiting = None
+        if self._waiting is None:
+            done = asyncio.get_running_loop().create_future()
+            self._waiting = (client, join, done)
+            hangup = asyncio.create_task(client.disconnected.wait())
+            await asyncio.wait((done, hangup),
+                               return_when=asyncio.FIRST_COMPLETED)
+            hangup.cancel()
+            if not done.done():
+                # Hung up before a partner came; a battle that started in
+                # the meantime is awaited through done
+                if self._waiting is not None and self._waiting[0] is client:
+                    self._waiting = None
+                    done.set_result(None)
+                await done
+            return
+        other, other_join, done = self._waiting
+        self._waiting = None
+        try:
+            await self._host(other, client, other_join, join)
+        finally:
+            done.set_result(None)
+
+    async def _host(self, client1, client2, join1, join2):
+        number = next(self._numbers)
+        try:
+            hosted = HostedBattle(
+                number, join1.get('party', 'random'),
+                join2.get('party', 'random'), client1, client2,
+                ai2=join2.get('ai', 'random'), seed=join1.get('seed'),
+                timeout=self.timeout, max_rounds=self.max_rounds)
+        except (KeyError, ValueError, TypeError, IndexError) as e:
+            for client in (client1, client2):
+                if client is not None:
+                    await client.send({'type': 'error',
+                                       'message': f'Invalid party: {e}'})
+            return
+        self.battles[number] = hosted
+        try:
+            await hosted.run()
+        finally:
+            del self.battles[number]
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Host battles over TCP.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--timeout', type=float, default=DECISION_TIMEOUT,
+                        help='seconds per decision before a random one')
+    args = parser.parse_args()
+    asyncio.run(BattleServer(args.timeout).serve(args.host, args.port))
@@ -1,5 +1,8 @@
 import globals
+from ids import BRN, PRZ
 from math import sqrt
+from array import array
+from functools import lru_cache
 
 # Define stat index mapping
 index_to_stat = {0: 'HP', 1: 'Attack', 2: 'Defense', 3: 'Speed',
@@ -21,238 +24,140 @@ def get_evasion_multiplier(stage):
     return stage_multipliers[-1 * int(stage)]
 
 
-class StatStage:
-    """
-    Define behavior of stat stages, used by Attack, Defense, Speed, Special,
-    Accuracy and Evasion.
-    """
-
-    def __init__(self):
-        self._value = 0
-
-    def __int__(self):
-        return self.value
-
-    @property
-    def value(self):
-        return self._value
-
-    @value.setter
-    def value(self, new_value):
-        if type(new_value) != int:
-            raise TypeError(f'Invalid stat stage {new_value}; doing nothing')
-        if new_value > -7 and new_value < 7:
-            self._value = new_value
-        else:
-            raise ValueError(f'Invalid stat stage {new_value}; doing nothing')
-
-    def can_change(self, stage_delta):
-        # Stat stages must be within [-6, 6]
-        new_value = self.value + stage_delta
-        if new_value > -7 and new_value < 7:
-            return True
-        else:
-            return False
-
-    def bad_change_message(self):
-        if self.value < 0:
-            return 'could not be lowered any more!'
-        else:
-            return 'could not be raised any more!'
-
-
-class AbstractStat:
-    """
-    Define common interface for all battle stats.
-    """
+# Divisor applied to each stat by one BRN (Attack) or PRZ (Speed) debuff
+debuff_divisors = (1, 2, 1, 4, 1)
+# Repeated debuffs bottom out at 1 long before this many
+MAX_DEBUFFS = 10
 
-    def __init__(self):
-        self._stage = StatStage()
-        self._value = None
 
-    @property
-    def value(self):
-        return self._value
-
-    @value.setter
-    def value(self, new_value):
-        self._value = new_value
-
-    @property
-    def stage(self):
-        return self._stage
-
-    def calculate_stat(self):
-        raise NotImplementedError('Cannot call calculate_stat from base class'
-                                  'AbstractStat!')
-
-    def can_change(self, stage_delta):
-        # By default, only check if the new stage is valid
-        return self.stage.can_change(stage_delta)
-
-    def bad_change_message(self):
-        return self.stage.bad_change_message()
-
-
-class MajorStat(AbstractStat):
+@lru_cache(maxsize=None)
+def stage_table(base, level):
     """
-    Define behavior of the four major stats: Attack, Defense, Speed and
-    Special.
+    Returns the values of a major stat (Attack, Defense, Speed or Special) at
+    stages -6 to 6, indexed by stage + 6. Tables are shared between all
+    Pokemon with the same base stat and level.
     """
-
-    def __init__(self, base, level):
-        super().__init__()
-        self._base = base
-        self._pkmn_lvl = level
-        self._DV = globals.MAX_DV
-        self._exp = globals.MAX_STAT_EXP
-        self._value = self.calculate_stat()
-
-    def __int__(self):
-        return self.value
-
-    @property
-    def value(self):
-        return self._value
-
-    @value.setter
-    def value(self, new_value):
-        # Major stats must be integers within the [1, 999] range
-        if type(new_value) == int and new_value > 0 and new_value < 1000:
-            self._value = new_value
-        else:
-            raise ValueError(f'Invalid stat value {new_value}; doing nothing')
-
-    def calculate_stat(self, crit=False, stage=None):
-        # Basic formula
-        stat = int(((self._base + self._DV) * 2 + int(sqrt(self._exp) / 4))
-                   * self._pkmn_lvl / 100) + 5
-        if not crit:
-            # Apply stage modifier, except for critical hits
-            if stage:
-                stage_multiplier = get_stat_multiplier(stage)
-            else:
-                stage_multiplier = get_stat_multiplier(self._stage)
-            stat = int(stat * stage_multiplier)
-        return stat
-
-    def can_change(self, stage_delta):
-        # First check if the new stage is within [-6, 6]
-        if not self.stage.can_change(stage_delta):
-            return False
-        # Next, the updated stat cannot lie outside [1, 999]
-        new_stage = int(self.stage) + stage_delta
-        new_value = self.calculate_stat(stage=new_stage)
-        if new_value < 1 or new_value > 999:
-            return False
-        else:
-            return True
-
-
-class MaxHP(MajorStat):
-    """
-    Define behavior of the maximum HP stat, which is slightly different from
-    the other major stats.
-    """
-
-    def __init__(self, base, level):
-        # Note that super().__init__ uses **MaxHP.calculate_stat**
-        # rather than MajorStat.calculate_stat
-        super().__init__(base, level)
-
-    def calculate_stat(self):
-        # Start with the basic formula
-        stat = super().calculate_stat(crit=False)
-        # Max HP behaves a little differently
-        stat += self._pkmn_lvl + 5
-        return stat
-
-
-class AccEvaStat(AbstractStat):
-    """
-    Define behavior of Accuracy/Evasion stats, which depend only on their
-    stat stage.
-    """
-
-    def __init__(self, name):
-        super().__init__()
-        self._name = name
-        self._value = self.calculate_stat()
-
-    def calculate_stat(self):
-        if self._name == 'acc':
-            return get_stat_multiplier(int(self._stage))
-        elif self._name == 'eva':
-            return get_evasion_multiplier(int(self._stage))
-        else:
-            raise ValueError(f'Invalid name {self._name}')
+    stat = int(((base + globals.MAX_DV) * 2
+                + int(sqrt(globals.MAX_STAT_EXP) / 4)) * level / 100) + 5
+    return tuple(int(stat * stage_multipliers[stage])
+                 for stage in range(-6, 7))
 
 
 class Stats:
     """
     Define interface to and behavior of a Pokemon's full set of battle stats.
+
+    Each major stat reads its value from a precomputed stage table. Stat
+    stages and the number of BRN/PRZ debuffs applied to each stat are kept in
+    small integer arrays; effective values (stage, then debuff) are cached and
+    only recomputed after one of them changes. Accuracy and Evasion values are
+    multipliers derived from their stages.
     """
 
+    __slots__ = ('_pkmn', '_max_hp', '_tables', '_stages', '_debuffs',
+                 '_values', '_dirty')
+
     def __init__(self, pkmn):
         self._pkmn = pkmn
-        self._pkmn_lvl = pkmn._level
-        self._base_stats = self._get_base_stats()
-        self._stats = self._create_stat_objects()
+        level = pkmn.level
+        base_stats = self._get_base_stats()
+        self._tables = tuple(stage_table(base, level) for base in base_stats)
+        self._max_hp = self._tables[0][6] + level + 5
+        self._stages = array('b', bytes(globals.NUM_BATTLE_STATS))
+        self._debuffs = array('b', bytes(globals.NUM_PERM_STATS))
+        self._values = array('H', bytes(2 * globals.NUM_PERM_STATS))
+        self._values[0] = self._max_hp
+        self._dirty = True
 
     def __getitem__(self, subscript):
         if type(subscript) != int:
             raise TypeError(f'Invalid subscript {subscript}')
-        if subscript < 0 or subscript > (len(self._stats) - 1):
+        if subscript < 0 or subscript > (globals.NUM_BATTLE_STATS - 1):
             raise IndexError(f'Invalid subscript {subscript}')
-        return self._stats[subscript].value
-
-    @property
-    def stats_l(self):
-        return self._stats
+        if subscript < globals.NUM_PERM_STATS:
+            if self._dirty:
+                self._refresh()
+            return self._values[subscript]
+        return self.calculate_stat(subscript)
 
     @property
     def max_hp(self):
-        return self._stats[0]
+        return self._max_hp
 
     @property
     def attack(self):
-        return self._stats[1]
+        if self._dirty:
+            self._refresh()
+        return self._values[1]
 
     @property
     def defense(self):
-        return self._stats[2]
+        if self._dirty:
+            self._refresh()
+        return self._values[2]
 
     @property
     def speed(self):
-        return self._stats[3]
+        if self._dirty:
+            self._refresh()
+        return self._values[3]
 
     @property
     def special(self):
-        return self._stats[4]
+        if self._dirty:
+            self._refresh()
+        return self._values[4]
 
     @property
     def accuracy(self):
-        return self._stats[5]
+        return get_stat_multiplier(self._stages[5])
 
     @property
     def evasion(self):
-        return self._stats[6]
+        return get_evasion_multiplier(self._stages[6])
 
     def get_stat_stages(self):
-        return [int(so.stage) for so in self._stats]
+        return list(self._stages)
+
+    def snapshot(self):
+        return (self._stages[:], self._debuffs[:], self._values[:],
+                self._dirty)
+
+    def restore(self, state):
+        self._stages[:], self._debuffs[:], self._values[:], self._dirty = state
 
     def reset_stat_stages(self):
-        for so in self._stats:
-            so.stage.value = 0
+        for i in range(globals.NUM_BATTLE_STATS):
+            self._stages[i] = 0
+        self._dirty = True
+
+    def calculate_stat(self, index, crit=False, stage=None):
+        """
+        Look up one stat at its current stage (or the given stage), without
+        BRN/PRZ debuff. Critical hits ignore the stage. Accuracy and Evasion
+        return their multiplier.
+        """
+        if stage is None:
+            stage = self._stages[index]
+        if index == 0:
+            return self._max_hp
+        if index == 5:
+            return get_stat_multiplier(stage)
+        if index == 6:
+            return get_evasion_multiplier(stage)
+        if crit:
+            stage = 0
+        return self._tables[index][stage + 6]
 
     def recalculate_one(self, index):
         """
         Recalculate (and update value of) one stat based on current stages.
-        Does not apply BRN/PRZ debuff.
+        Does not apply BRN/PRZ debuff, and drops any debuff already applied.
         """
         self._validate_index(index)
-        so = self._stats[index]
-        so.value = so.calculate_stat()
+        if index < globals.NUM_PERM_STATS and self._debuffs[index]:
+            self._debuffs[index] = 0
+            self._dirty = True
 
     def recalculate_all(self):
         """
@@ -264,29 +169,41 @@ class Stats:
 
     def apply_status_debuff(self):
         """
-        Apply the Attack (Speed) stat debuff caused by BRN (PRZ).
+        Apply the Attack (Speed) stat debuff caused by BRN (PRZ). Like in Gen
+        1, applying it again stacks on top of the existing debuff.
         """
-        if self._pkmn.sm.status not in ['BRN', 'PRZ']:
-            return
-        elif self._pkmn.sm.status == 'BRN':
-            new = self.attack.value // 2
-            self.attack.value = new if new > 0 else 1
-            return
+        status = self._pkmn.sm.status_id
+        if status == BRN:
+            index = 1
+        elif status == PRZ:
+            index = 3
         else:
-            new = self.speed.value // 4
-            self.speed.value = new if new > 0 else 1
             return
+        if self._debuffs[index] < MAX_DEBUFFS:
+            self._debuffs[index] += 1
+            self._dirty = True
 
     def can_change(self, index, stage_delta):
         self._validate_index(index)
-        return self._stats[index].can_change(stage_delta)
+        # Stat stages must be within [-6, 6]
+        new_stage = self._stages[index] + stage_delta
+        if new_stage < -6 or new_stage > 6:
+            return False
+        # For major stats, the updated stat cannot lie outside [1, 999]
+        if index < globals.NUM_PERM_STATS:
+            new_value = self._tables[index][new_stage + 6]
+            if new_value < 1 or new_value > 999:
+                return False
+        return True
 
     def get_bad_change_message(self, index):
+        """
+        Returns the message ID and arguments (see Colleague.post) for a stat
+        that cannot change any further.
+        """
         self._validate_index(index)
-        message = f'{self._pkmn.name}\'s '
-        message += f'{index_to_stat[index]} '
-        message += self._stats[index].bad_change_message()
-        return message
+        msg_id = 'stat_min' if self._stages[index] < 0 else 'stat_max'
+        return msg_id, self._pkmn.name, index_to_stat[index]
 
     def modify_stat(self, index, stage_delta):
         self._validate_index(index)
@@ -294,39 +211,36 @@ class Stats:
             # Safety check
             raise ValueError(f'Stat index {index} cannot be changed by '
                              f'delta = {stage_delta}')
-        self._stats[index].stage.value += stage_delta
+        self._stages[index] += stage_delta
+        self._dirty = True
         self.recalculate_one(index)
 
     def get_modified_message(self, index, stage_delta):
+        """
+        Returns the message ID and arguments (see Colleague.post) for a stat
+        change.
+        """
         self._validate_index(index)
-        message = f'{self._pkmn.name}\'s '
-        message += f'{index_to_stat[index]} '
-        sharply = ('sharply ' if abs(stage_delta) >= 2
-                   else '')
-        message += sharply
-        message += ('increased!' if stage_delta > 0
-                    else 'decreased!')
-        return message
+        msg_id = 'stat_rose' if stage_delta > 0 else 'stat_fell'
+        if abs(stage_delta) >= 2:
+            msg_id += '_sharply'
+        return msg_id, self._pkmn.name, index_to_stat[index]
 
     def _get_base_stats(self):
-        base_stats = []
-        base_stats.append(self._pkmn.base_hp)
-        base_stats.append(self._pkmn.base_att)
-        base_stats.append(self._pkmn.base_def)
-        base_stats.append(self._pkmn.base_spe)
-        base_stats.append(self._pkmn.base_spc)
-        return base_stats
-
-    def _create_stat_objects(self):
-        stat_objects = []
-        stat_objects.append(MaxHP(self._base_stats[0], self._pkmn_lvl))
-        stat_objects.append(MajorStat(self._base_stats[1], self._pkmn_lvl))
-        stat_objects.append(MajorStat(self._base_stats[2], self._pkmn_lvl))
-        stat_objects.append(MajorStat(self._base_stats[3], self._pkmn_lvl))
-        stat_objects.append(MajorStat(self._base_stats[4], self._pkmn_lvl))
-        stat_objects.append(AccEvaStat('acc'))
-        stat_objects.append(AccEvaStat('eva'))
-        return stat_objects
+        return (self._pkmn.base_hp, self._pkmn.base_att, self._pkmn.base_def,
+                self._pkmn.base_spe, self._pkmn.base_spc)
+
+    def _refresh(self):
+        """
+        Recompute the cached values of the four major stats.
+        """
+        for i in range(1, globals.NUM_PERM_STATS):
+            value = self._tables[i][self._stages[i] + 6]
+            n = self._debuffs[i]
+            if n:
+                value = max(value // debuff_divisors[i]**n, 1)
+            self._values[i] = value
+        self._dirty = False
 
     def _validate_index(self, index):
         if type(index) != int or index not in range(1, 7):
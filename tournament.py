@@ -0,0 +1,94 @@
+from battle import simulate
+from rng import derive_seed
+from instrument import merge_snapshots
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+# Battles per shard. Shards (not workers) are the unit of seeding, so the
+# merged results only depend on the master seed and the shard size.
+SHARD_SIZE = 100
+
+# Result keys that are summed when merging shards
+COUNT_KEYS = ['battles', 'wins1', 'wins2', 'draws', 'rounds']
+
+
+def run_battles(n, party1='random', party2='random', ai1='random',
+                ai2='random', seed=0, workers=None, shard_size=SHARD_SIZE,
+                max_rounds=1000):
+    """
+    Runs n headless battles between the same two parties, spread across a
+    process pool. Returns the merged result dict (see battle.simulate).
+    """
+    return run_pairings([(party1, party2)], n, ai1=ai1, ai2=ai2, seed=seed,
+                        workers=workers, shard_size=shard_size,
+                        max_rounds=max_rounds)[0]
+
+
+def run_pairings(pairings, n, ai1='random', ai2='random', seed=0,
+                 workers=None, shard_size=SHARD_SIZE, max_rounds=1000):
+    """
+    Runs n headless battles for each (party1, party2) pairing, spread across a
+    process pool with the given number of workers (default: all cores).
+    Returns a list with one merged result dict per pairing, in order. The
+    win/draw/round counts are identical for any number of workers.
+    """
+    shards = _make_shards(pairings, n, ai1, ai2, seed, shard_size,
+                          max_rounds)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        shard_results = [_run_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shard_results = list(executor.map(_run_shard, shards))
+    elapsed = time.perf_counter() - start
+
+    results = [_empty_result() for _ in pairings]
+    for shard, res in zip(shards, shard_results):
+        merged = results[shard['pairing']]
+        for key in COUNT_KEYS:
+            merged[key] += res[key]
+        if 'instrumentation' in res:
+            merged['instrumentation'] = merge_snapshots(
+                merged.get('instrumentation'), res['instrumentation'])
+    for res in results:
+        res['elapsed'] = elapsed
+        res['battles_per_sec'] = (res['battles'] / elapsed if elapsed > 0
+                                  else float('inf'))
+    return results
+
+
+def _empty_result():
+    return {key: 0 for key in COUNT_KEYS}
+
+
+def _make_shards(pairings, n, ai1, ai2, seed, shard_size, max_rounds):
+    """
+    Splits the battles for every pairing into shards of at most shard_size
+    battles, each with its own derived seed.
+    """
+    if shard_size < 1:
+        raise ValueError(f'Invalid shard size {shard_size}')
+    shards = []
+    for i, (party1, party2) in enumerate(pairings):
+        for first in range(0, n, shard_size):
+            shards.append({'pairing': i,
+                           'party1': party1,
+                           'party2': party2,
+                           'ai1': ai1,
+                           'ai2': ai2,
+                           'n': min(shard_size, n - first),
+                           'max_rounds': max_rounds,
+                           'seed': derive_seed(seed, len(shards))})
+    return shards
+
+
+def _run_shard(shard):
+    """
+    Worker entry point: runs one shard of battles from its own seed.
+    """
+    return simulate(shard['party1'], shard['party2'], shard['ai1'],
+                    shard['ai2'], shard['n'], shard['max_rounds'],
+                    seed=shard['seed'])
@@ -1,17 +1,74 @@
 import globals
-from mediator import Colleague
+from mediator import Colleague, SwapEvent
 from pokemon import Pokemon
+from move import STRUGGLE_INDEX
 from ui import post_message
-import random
+from rng import default_rng
+
+
+# Kinds of decisions
+ACTION, SWAP = 'action', 'swap'
+
+
+class DecisionRequest:
+    """
+    A decision a trainer has to make: their action for the round, or which
+    Pokemon to send out after a faint.
+    """
+    __slots__ = ('trainer', 'other', 'kind')
+
+    def __init__(self, trainer, other, kind):
+        self.trainer = trainer
+        self.other = other
+        self.kind = kind
+
+    @property
+    def legal(self):
+        """
+        The list of actions the trainer can choose from.
+        """
+        if self.kind == ACTION:
+            return legal_actions(self.trainer)
+        return legal_swaps(self.trainer)
+
+
+def legal_actions(trainer):
+    """
+    Returns the list of actions trainer can choose this round.
+    """
+    pkmn = trainer.active
+    if not pkmn.sm.can_select_move:
+        return [('move', pkmn.last_used_move_index)]
+    actions = [('move', i) for i, move in enumerate(pkmn.moves)
+               if move.pp > 0]
+    if not actions:
+        actions = [('move', STRUGGLE_INDEX)]
+    return actions + legal_swaps(trainer)
+
+
+def legal_swaps(trainer):
+    return [('swap', i) for i, pkmn in enumerate(trainer.party)
+            if pkmn is not trainer.active and not pkmn.is_fainted()]
+
+
+def is_legal(trainer, action):
+    if action[0] == 'swap':
+        pkmn = trainer.party[action[1]]
+        return pkmn is not trainer.active and not pkmn.is_fainted()
+    moves = trainer.active.moves
+    if action[1] == STRUGGLE_INDEX:
+        return all(move.pp == 0 for move in moves)
+    return action[1] < len(moves) and moves[action[1]].pp > 0
 
 
 class Trainer(Colleague):
     """
     """
 
-    def __init__(self, name, party='random', party_size=2):
+    def __init__(self, name, party='random', party_size=2, rng=None):
         super().__init__()
         self.name = name
+        self.rng = rng if rng else default_rng
         self._ai = None
         self.party = self._init_party(party, party_size)
         self._active = self.party[0]
@@ -38,17 +95,35 @@ class Trainer(Colleague):
             raise ValueError('Trying to swap to a fainted Pokemon! '
                              f'(index = {index})')
         else:
-            self.mediator.remove_colleague(self._active)
+            new_active = self.party[index]
+            self.mediator.replace_colleague(self._active, new_active)
             self._active.retreat()
-            self._active = self.party[index]
+            self._active = new_active
             self._active.stats.reset_stat_stages()
             self._active.stats.recalculate_all()
-            self.mediator.add_colleague(self._active)
+
+    def snapshot(self):
+        """
+        Returns the trainer's mutable battle state (active index, next action
+        and each party member's state) as a tuple.
+        """
+        return (self.party.index(self._active), self.next_action,
+                tuple([pkmn.snapshot() for pkmn in self.party]))
+
+    def restore(self, state):
+        index, self.next_action, party_states = state
+        for pkmn, pkmn_state in zip(self.party, party_states):
+            pkmn.restore(pkmn_state)
+        # Swap in place, without the retreat effects of a real swap
+        new_active = self.party[index]
+        if new_active is not self._active:
+            self.mediator.replace_colleague(self._active, new_active)
+            self._active = new_active
 
     def swap(self, index):
         self.active = index
-        post_message(f'Go, {self.active.name}!')
-        self.send_event({'event_type': 'swap', 'trainer': self})
+        self.post('sent_out', self.active.name)
+        self.send_event(SwapEvent(self))
 
     def all_fainted(self):
         return len(self.party_alive) == 0
@@ -62,14 +137,27 @@ class Trainer(Colleague):
     def get_swap(self):
         return self._ai.get_swap()
 
+    def decide(self, kind):
+        """
+        Asks the AI for a decision of the given kind (ACTION or SWAP).
+        """
+        return self.get_action() if kind == ACTION else self.get_swap()
+
     def update_action(self):
-        self.next_action = self.get_action()
+        self.set_action(self.get_action())
 
-    def receive_event(self, event_d):
-        if event_d['event_type'] == 'faint':
-            self._process_faint_event(event_d)
-        else:
-            pass
+    def set_action(self, action):
+        self.next_action = action
+        if self.rng.recorder is not None:
+            self.rng.recorder.decision(self, action)
+
+    def faint_swap(self, action):
+        """
+        Sends out the Pokemon chosen after the active one fainted.
+        """
+        if self.rng.recorder is not None:
+            self.rng.recorder.decision(self, action, faint=True)
+        self.swap(action[1])
 
     def print(self, stats=False, seen_moves=False):
         if globals.UI == 'text':
@@ -99,21 +187,15 @@ class Trainer(Colleague):
         ret = []
         if party == 'random':
             try:
-                ret = [Pokemon(species) for species in
-                       random.sample(globals.species_list, party_size)]
+                ret = [Pokemon(species, rng=self.rng) for species in
+                       self.rng.sample(globals.species_list, party_size)]
             except ValueError:
-                ret = [Pokemon('Tauros')] * party_size
+                ret = [Pokemon('Tauros', rng=self.rng)] * party_size
         elif type(party) == dict:
             # Assume keys are species, and values are tuples of level, moveset
             for species, tup in party.items():
-                ret.append(Pokemon(species, tup[1], tup[0]))
+                ret.append(Pokemon(species, tup[1], tup[0], self.rng))
         else:
             raise ValueError(f'Invalid starting party {party}; should be dict '
                              'or "random"')
         return ret
-
-    def _process_faint_event(self, event_d):
-        pkmn = event_d['pkmn']
-        if pkmn == self._active and len(self.party_alive) > 0:
-            action = self.get_swap()
-            self.swap(action[1])
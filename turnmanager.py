@@ -1,6 +1,8 @@
 import globals
-from ui import post_message
-import random
+from rng import default_rng
+from eventlog import FULL_PRZ, HIT_SELF, DAMAGE_ROLL
+from statusmanager import BEFORE_MOVE_MASK
+from ids import PRZ, BRN, FRZ, SLP, POISONED
 
 
 class TurnManager:
@@ -16,11 +18,16 @@ class TurnManager:
     is trapping/binding, which changes in RoundManager.end_round().
     """
 
-    def __init__(self, mu):
+    def __init__(self, mu, rng=None):
         self.mu = mu
+        self.rng = rng if rng else default_rng
         self._counter_last_damage = 0
         self._trap_damage = 0
 
+    def post(self, msg_id, *args):
+        # Not a colleague itself, so posts through the MoveUser
+        self.mu.post(msg_id, *args)
+
     @property
     def counter_last_damage(self):
         return self._counter_last_damage
@@ -64,15 +71,23 @@ class TurnManager:
             - 'trap_active'
             - 'hit_self'
         """
+        # Most turns, nothing affects whether the Pokemon can move
+        if not user.sm.mask & BEFORE_MOVE_MASK:
+            return {'can_move': True,
+                    'fully_przd': False,
+                    'asleep_frozen': False,
+                    'flinched': False,
+                    'recharging': False,
+                    'trap_active': False,
+                    'hit_self': False}
+
         bm_dict = {}
-        update_fns = [self.update_major_status,
-                      self.update_flinch,
-                      self.update_recharge,
-                      self.update_trap_active,
-                      self.update_disable,
-                      self.update_confusion]
-        for fn in update_fns:
-            fn(user, bm_dict)
+        self.update_major_status(user, bm_dict)
+        self.update_flinch(user, bm_dict)
+        self.update_recharge(user, bm_dict)
+        self.update_trap_active(user, bm_dict)
+        self.update_disable(user, bm_dict)
+        self.update_confusion(user, bm_dict)
 
         # Overall can/can't move
         can_move = self.can_move(bm_dict)
@@ -102,10 +117,11 @@ class TurnManager:
         If so, posts message. Updates bm_dict with Boolean result.
         """
         fully_przd = False
-        if pkmn.sm.status == 'PRZ':
-            fully_przd = globals.rng_check(globals.FULL_PRZ_CHANCE)
+        if pkmn.sm.status_id == PRZ:
+            fully_przd = globals.rng_check(globals.FULL_PRZ_CHANCE, self.rng)
+            self.rng.record(FULL_PRZ, fully_przd)
             if fully_przd:
-                post_message(f'{pkmn.name} is fully paralyzed!')
+                self.post('fully_paralyzed', pkmn.name)
         bm_dict['fully_przd'] = fully_przd
 
     def update_major_status(self, pkmn, bm_dict):
@@ -117,19 +133,18 @@ class TurnManager:
         """
         self.update_fully_przd(pkmn, bm_dict)
         asleep_frozen = False
-        if pkmn.sm.status == 'SLP':
+        if pkmn.sm.status_id == SLP:
             asleep_frozen = True
-            message = pkmn.sm.decrement_counter('sleep')
-            post_message(message)
-        if pkmn.sm.status == 'FRZ':
+            self.post(pkmn.sm.decrement_counter('sleep'), pkmn.name)
+        if pkmn.sm.status_id == FRZ:
             asleep_frozen = True
-            post_message(f'{pkmn.name} is frozen solid!')
+            self.post('frozen_solid', pkmn.name)
         bm_dict['asleep_frozen'] = asleep_frozen
 
     def update_flinch(self, pkmn, bm_dict):
         if pkmn.sm.get_flag('flinch'):
             flinched = True
-            post_message(f'{pkmn.name} flinched!')
+            self.post('flinch', pkmn.name)
             # Reset the flinch flag
             pkmn.sm.reset_flag('flinch')
         else:
@@ -139,9 +154,9 @@ class TurnManager:
     def update_recharge(self, pkmn, bm_dict):
         if pkmn.sm.get_flag('recharge'):
             recharging = True
-            post_message(f'{pkmn.name} has to recharge!')
+            self.post('recharge', pkmn.name)
             # Reset the recharge flag, unless pkmn is frozen
-            if pkmn.sm.status != 'FRZ':
+            if pkmn.sm.status_id != FRZ:
                 pkmn.sm.reset_flag('recharge')
         else:
             recharging = False
@@ -184,14 +199,12 @@ class TurnManager:
     def update_disable(self, pkmn, bm_dict):
         if self.decrement_cnf_dsb(bm_dict):
             if pkmn.sm.get_counter('disable'):
-                msg = pkmn.sm.decrement_counter('disable')
-                post_message(msg)
+                self.post(pkmn.sm.decrement_counter('disable'), pkmn.name)
 
     def update_confusion(self, pkmn, bm_dict):
         if self.decrement_cnf_dsb(bm_dict):
             if pkmn.sm.get_counter('confusion'):
-                msg = pkmn.sm.decrement_counter('confusion')
-                post_message(msg)
+                self.post(pkmn.sm.decrement_counter('confusion'), pkmn.name)
 
     def confusion_check(self, user, other):
         """
@@ -200,11 +213,12 @@ class TurnManager:
         """
         hits_self = False
         if user.sm.get_counter('confusion'):
-            hits_self = globals.rng_check(50)
+            hits_self = globals.rng_check(50, self.rng)
+            self.rng.record(HIT_SELF, hits_self)
             if hits_self:
                 dmg = self.confusion_damage(user, other)
                 user.current_hp -= dmg
-                post_message(f'{user.name} hit itself in confusion!')
+                self.post('hit_itself', user.name)
         return hits_self
 
     def confusion_damage(self, user, other):
@@ -229,7 +243,8 @@ class TurnManager:
                 d = d % 1024
         if a > 255 or d > 255:
             a = a//4
-            d = d//4
+            # Avoid dividing by zero when a tiny stat is scaled down
+            d = max(d//4, 1)
 
         power = 40
         damage = int((2*user.level/5 + 2)*power*a/(d*50) + 2)
@@ -237,7 +252,8 @@ class TurnManager:
         if damage == 1:
             rand_mult = 255
         else:
-            rand_mult = random.randrange(217, 256)
+            rand_mult = self.rng.damage_roll()
+            self.rng.record(DAMAGE_ROLL, rand_mult)
         damage = damage * rand_mult // 255
         # Finally check if damage exceeds target's HP
         damage = min(damage, user.current_hp)
@@ -259,55 +275,50 @@ class TurnManager:
             decrement_mlt = ((not bm_dict['asleep_frozen'])
                              and (not bm_dict['trap_active']))
             if decrement_mlt:
-                msg = pkmn.sm.decrement_counter('multiturn')
-                post_message(msg)
+                self.post(pkmn.sm.decrement_counter('multiturn'), pkmn.name)
 
     def apply_all_recurring_damage(self, user, other):
         """
         Apply recurring damage from burn, poison, leech seed
         """
-        if user.sm.status in ['BRN', 'PSN', 'TXC']:
+        if user.sm.status_id & (BRN | POISONED):
             self.apply_one_recurring_damage(user)
         if user.sm.get_flag('seed'):
             dmg = self.apply_one_recurring_damage(user, seed=True)
             self.seed_heal(other, dmg)
 
     def apply_one_recurring_damage(self, target, seed=False):
-        counter = target.sm.get_counter('toxic')
-        toxic_active = counter.val
-        toxic_N = counter.cval
+        toxic_active = target.sm.get_counter('toxic')
+        toxic_N = target.sm.get_cval('toxic')
         damage = toxic_N*(target.max_hp//16)
         # Always do at least 1 HP of damage
         if damage == 0:
             damage = 1
         damage = min(damage, target.current_hp)
-        target.current_hp -= damage
+        # Post the message before applying damage, since a faint overwrites
+        # the target's status with 'FNT'
         if seed:
-            message = f'{target.name}\'s health was drained!'
-            # message = (f'{target.name}\'s health was drained! (-{damage} HP,'
-            #            f' N={toxic_N})')
+            msg_id = 'seed_drained'
         else:
-            message = f'{target.name} was affected by its '
-            if target.sm.status == 'BRN':
-                message += 'burn!'
-                # message += f'burn! (-{damage}, N={toxic_N})'
-            elif target.sm.status in ['PSN', 'TXC']:
-                message += 'poison!'
-                # message += f'poison! (-{damage}, N={toxic_N})'
+            if target.sm.status_id == BRN:
+                msg_id = 'burn_damage'
+            elif target.sm.status_id & POISONED:
+                msg_id = 'poison_damage'
             else:
                 raise ValueError('Called apply_one_recurring_damage() on '
                                  f'healthy Pokemon: name={target.name}, '
                                  f'status={target.sm.status}')
+        self.post(msg_id, target.name)
         if globals.DEBUG:
-            message += f'\n(-{damage} HP, N = {toxic_N})'
-        post_message(message)
+            self.post('recurring_damage_debug', damage, toxic_N)
+        target.current_hp -= damage
         if toxic_active:
             target.sm.increment_toxic()
         return damage
 
     def seed_heal(self, target, amount):
         target.current_hp += amount
-        post_message(f'{target.name} was healed!')
+        self.post('seed_healed', target.name)
 
     def check_for_faints(self, user, other):
         something_fainted = False
@@ -0,0 +1,37 @@
+"""
+Type effectiveness chart, validated and compiled by datacache into tables
+indexed by integer type IDs (the index in globals.types; 'None', the second
+type of single-type Pokemon, is 0). chart[attack][defend] is the multiplier
+against one type and dual_chart[attack][type1][type2] the combined multiplier
+against a Pokemon. Gen 1 damage applies the two single-type multipliers one
+at a time, with rounding in between, so damage math uses chart and the
+combined table is for effectiveness checks and heuristics.
+"""
+
+import globals
+
+type_names = tuple(globals.types)
+type_ids = {name: i for i, name in enumerate(type_names)}
+NUM_TYPES = len(type_names)
+NONE = type_ids['None']
+
+chart = globals.type_chart
+dual_chart = globals.dual_type_chart
+
+_arrays = None
+
+
+def as_arrays():
+    """
+    Returns (chart, dual_chart) as read-only NumPy arrays of shape (16, 16)
+    and (16, 16, 16). NumPy is only imported when this is first called.
+    """
+    global _arrays
+    if _arrays is None:
+        import numpy as np
+        single = np.array(chart, dtype=np.float64)
+        dual = np.array(dual_chart, dtype=np.float64)
+        single.flags.writeable = False
+        dual.flags.writeable = False
+        _arrays = (single, dual)
+    return _arrays
@@ -1,28 +1,97 @@
 import globals
+from messages import render
 
 
 def post_message(*args, **kwargs):
+    """
+    Prints preformatted text for the text UI (menus and status screens), and
+    by default waits for input. Does nothing unless the UI is 'text'. Battle
+    messages go through Colleague.post instead.
+    """
     if globals.UI == 'text':
-        wait = True
-        if 'wait' in kwargs:
-            wait = kwargs.pop('wait')
-        if 'end' not in kwargs:
-            if wait:
-                kwargs['end'] = ''
-            else:
-                kwargs['end'] = '\n'
-        print(*args, **kwargs)
-        if wait:
-            input()
+        _print(*args, **kwargs)
     else:
         pass
 
 
+def _print(*args, **kwargs):
+    wait = True
+    if 'wait' in kwargs:
+        wait = kwargs.pop('wait')
+    if 'end' not in kwargs:
+        if wait:
+            kwargs['end'] = ''
+        else:
+            kwargs['end'] = '\n'
+    print(*args, **kwargs)
+    if wait:
+        input()
+
+
+class NullSink:
+    """
+    Discards every message. Used for headless battles and simulations.
+    """
+
+    def post(self, msg_id, args):
+        pass
+
+
+class InteractiveSink(NullSink):
+    """
+    Prints every message and waits for input, for the text UI.
+    """
+
+    def post(self, msg_id, args):
+        _print(render(msg_id, args))
+
+
+class BufferedTextSink(NullSink):
+    """
+    Formats every message into lines, without printing anything.
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def post(self, msg_id, args):
+        self.lines.append(render(msg_id, args))
+
+    def text(self):
+        return '\n'.join(self.lines)
+
+
+class StructuredSink(NullSink):
+    """
+    Records every message as an (ID, arguments) pair without formatting it,
+    e.g. for a GUI or for analysis; lines() renders them.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def post(self, msg_id, args):
+        self.events.append((msg_id, args))
+
+    def lines(self):
+        return [render(msg_id, args) for msg_id, args in self.events]
+
+
+def default_sink(ui):
+    """
+    Returns a new sink for a battle with the given UI type.
+    """
+    return InteractiveSink() if ui == 'text' else NullSink()
+
+
 def get_UI(trainer):
     if globals.UI == 'text':
         return TextUI(trainer)
     elif globals.UI == 'gui':
         return GraphicalUI(trainer)
+    elif globals.UI == 'none':
+        raise ValueError('Headless UI "none" cannot take player input; use a '
+                         'non-human AI instead')
     else:
         raise ValueError(f'Invalid UI type {globals.UI} !')
 
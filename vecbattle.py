@@ -0,0 +1,626 @@
+"""
+Vectorized battle engine. Keeps the state of K battles in NumPy arrays (struct
+of arrays) and advances all of them by one round per step, with both trainers
+playing like RandomAI.
+
+The rules follow RoundManager.round, TurnManager.before_move/after_move and
+MoveUser.apply_move for everything the object engine currently implements:
+damage (including fixed damage and OHKO moves), major status conditions with
+their sleep/toxic counters, stat stages with the Gen 1 BRN/PRZ debuff quirks,
+PP, Struggle, and faint-triggered swaps. Volatile statuses (confusion, flinch,
+recharge, trapping, ...) are never switched on by the object engine, so they
+are not tracked here either.
+"""
+
+import globals
+from stats import stage_multipliers
+from typechart import type_ids, as_arrays
+from ids import (move_names, move_ids, category_ids, status_ids, target_ids,
+                 fixed_damage_id, STRUGGLE_ID, REST_ID, PHYSICAL, SPECIAL,
+                 STATUS, STAT, NO_STATUS, PRZ, BRN, FRZ, SLP, PSN, TXC, FNT,
+                 SELF, FD_NONE, FD_VALUE, FD_LEVEL, FD_RANDOM,
+                 FD_HALF_CURRENT, FD_LAST_DAMAGE)
+from rng import MIN_DAMAGE_ROLL, MAX_DAMAGE_ROLL
+from math import sqrt
+import numpy as np
+import time
+
+# Statuses, move categories and fixed-damage kinds are stored as their IDs
+# (see ids); Unique and VStatus moves have no implemented effect. OHKO moves
+# get one more fixed-damage kind (MoveUser.get_ohko_damage).
+FD_OHKO = FD_LAST_DAMAGE + 1
+
+# Column indices of the four major battle stats (stats index - 1); stat
+# stages also use 4 and 5 for Accuracy and Evasion
+ATT, DEF, SPE, SPC, ACC, EVA = range(6)
+
+# Action index for Struggle
+STRUGGLE = 4
+
+MAX_TOXIC_N = 15
+MAX_MOVES = 4
+
+STAGE_MULT = np.array([stage_multipliers[s] for s in range(-6, 7)])
+
+TYPE_CHART, DUAL_TYPE_CHART = as_arrays()
+
+
+class MoveTable:
+    """
+    Move data from globals.moves_dict as arrays indexed by move ID (see ids).
+    """
+
+    def __init__(self):
+        names = move_names
+        self.ids = move_ids
+        self.struggle = STRUGGLE_ID
+        self.rest = REST_ID
+        n = len(names)
+        self.category = np.zeros(n, dtype=np.int64)
+        self.type = np.zeros(n, dtype=np.int64)
+        self.power = np.zeros(n, dtype=np.int64)
+        self.accuracy = np.zeros(n)
+        self.acc_always = np.zeros(n, dtype=bool)
+        self.priority = np.zeros(n, dtype=np.int64)
+        self.max_pp = np.zeros(n, dtype=np.int64)
+        self.high_crit = np.zeros(n, dtype=np.int64)
+        self.fixed = np.full(n, FD_NONE)
+        self.fixed_value = np.zeros(n, dtype=np.int64)
+        self.status = np.full(n, NO_STATUS)
+        self.status_self = np.zeros(n, dtype=bool)
+        self.status_accuracy = np.zeros(n)
+        self.status_acc_always = np.zeros(n, dtype=bool)
+        self.stat_index = np.zeros(n, dtype=np.int64)
+        self.stat_delta = np.zeros(n, dtype=np.int64)
+        self.stat_self = np.zeros(n, dtype=bool)
+        self.stat_accuracy = np.zeros(n)
+        self.stat_acc_always = np.zeros(n, dtype=bool)
+        for i, name in enumerate(names):
+            self._fill(i, globals.get_move_dict(name))
+
+    def _fill(self, i, d):
+        self.category[i] = category_ids[d['category']]
+        self.type[i] = type_ids[d['type']]
+        self.priority[i] = d['priority']
+        self.max_pp[i] = d['max_pp']
+        self.high_crit[i] = d['high_crit'] if d['high_crit'] else 0
+        self.accuracy[i], self.acc_always[i] = _accuracy(d['accuracy'])
+        if d['base_power'] == '-':
+            if d['ohko']:
+                self.fixed[i] = FD_OHKO
+            else:
+                self.fixed[i] = fixed_damage_id(d['fixed_damage'])
+                if self.fixed[i] == FD_VALUE:
+                    self.fixed_value[i] = d['fixed_damage']
+        else:
+            self.power[i] = d['base_power']
+        if d['status_accuracy']:
+            self.status[i] = status_ids[d['status']]
+            self.status_self[i] = target_ids[d['status_target']] == SELF
+            self.status_accuracy[i], self.status_acc_always[i] = \
+                _accuracy(d['status_accuracy'])
+        if d['stat_accuracy']:
+            self.stat_index[i] = d['stat_index']
+            self.stat_delta[i] = d['stat_delta']
+            self.stat_self[i] = target_ids[d['stat_target']] == SELF
+            self.stat_accuracy[i], self.stat_acc_always[i] = \
+                _accuracy(d['stat_accuracy'])
+
+
+def _accuracy(val):
+    """
+    Returns (accuracy, always_hits) for an accuracy field that is a percentage
+    or '-'.
+    """
+    if val == '-':
+        return 0., True
+    return float(val), False
+
+
+def unmodified_stats(base, level):
+    """
+    Vectorized Stats.calculate_stat(crit=True): the stat with max DVs and
+    stat exp, before stages and status debuffs.
+    """
+    stat_exp = int(sqrt(globals.MAX_STAT_EXP) / 4)
+    return (((base + globals.MAX_DV) * 2 + stat_exp) * level / 100
+            ).astype(np.int64) + 5
+
+
+moves_table = MoveTable()
+
+
+class VecBattles:
+    """
+    K independent battles advanced in lockstep. Parties use the Trainer format
+    (dict of species: (level, moves), where level may be None and moves may
+    be 'random'), or 'random' for a random party of two.
+
+    Per-Pokemon arrays have shape (K, 2, P) for K battles, 2 trainers and
+    parties of up to P Pokemon. Stat stages, current stat values and the toxic
+    counter belong to the active Pokemon and have shape (K, 2, ...); they are
+    reset on every swap, like Trainer.active does.
+    """
+
+    def __init__(self, parties1, parties2, seed=None):
+        if len(parties1) != len(parties2):
+            raise ValueError(f'Got {len(parties1)} and {len(parties2)} '
+                             'parties; need one pair per battle')
+        self.rng = np.random.default_rng(seed)
+        self.mt = moves_table
+        self.k = len(parties1)
+        self._init_pokemon(parties1, parties2)
+        k = self.k
+        self.active = np.zeros((k, 2), dtype=np.int64)
+        self.stages = np.zeros((k, 2, 6), dtype=np.int64)
+        self.values = self.raw[:, :, 0, :].copy()
+        self.toxic_on = np.zeros((k, 2), dtype=bool)
+        self.toxic_n = np.ones((k, 2), dtype=np.int64)
+        self.action = np.zeros((k, 2), dtype=np.int64)
+        self.rounds = np.zeros(k, dtype=np.int64)
+        self.done = np.zeros(k, dtype=bool)
+        self.winner = np.zeros(k, dtype=np.int64)
+        self._faint = np.zeros(k, dtype=bool)
+        self._end_round = np.zeros((k, 2), dtype=bool)
+        self._update_done()
+
+    @classmethod
+    def from_pairing(cls, party1, party2, k, seed=None):
+        """
+        K battles between the same two parties.
+        """
+        return cls([party1] * k, [party2] * k, seed)
+
+    def step(self):
+        """
+        Advances every unfinished battle by one round (RoundManager.round).
+        """
+        live = np.flatnonzero(~self.done)
+        if not live.size:
+            return
+        self._faint[live] = False
+        self._end_round[live] = False
+        self._choose_actions(live)
+        first = self._turn_order(live)
+        self._turn(live, first)
+        # A faint ends the round
+        proceed = ~self._faint[live]
+        idx, first = live[proceed], first[proceed]
+        self._turn(idx, 1 - first)
+        proceed = ~self._faint[idx]
+        idx, first = idx[proceed], first[proceed]
+        # Recurring damage for Pokemon that could not move
+        for side in (first, 1 - first):
+            m = self._end_round[idx, side]
+            self._recurring_damage(idx[m], side[m])
+        self.rounds[live] += 1
+        self._swap_fainted()
+        self._update_done()
+
+    def run(self, max_rounds=1000):
+        """
+        Steps until every battle is over, or max_rounds rounds have been
+        played; unfinished battles count as draws. Returns a result dict in
+        the same format as battle.simulate.
+        """
+        start = time.perf_counter()
+        for _ in range(max_rounds):
+            if self.done.all():
+                break
+            self.step()
+        elapsed = time.perf_counter() - start
+        res = self.results()
+        res['elapsed'] = elapsed
+        res['battles_per_sec'] = (self.k / elapsed if elapsed > 0
+                                  else float('inf'))
+        return res
+
+    def results(self):
+        wins1 = int(np.count_nonzero(self.winner == 1))
+        wins2 = int(np.count_nonzero(self.winner == 2))
+        return {'battles': self.k,
+                'wins1': wins1,
+                'wins2': wins2,
+                'draws': self.k - wins1 - wins2,
+                'rounds': int(self.rounds.sum())}
+
+    def _init_pokemon(self, parties1, parties2):
+        rows = [[self._party_rows(p) for p in pair]
+                for pair in zip(parties1, parties2)]
+        size = max(len(party) for pair in rows for party in pair)
+        k = self.k
+        self.level = np.zeros((k, 2, size), dtype=np.int64)
+        self.max_hp = np.zeros((k, 2, size), dtype=np.int64)
+        self.raw = np.ones((k, 2, size, 4), dtype=np.int64)
+        self.type1 = np.zeros((k, 2, size), dtype=np.int64)
+        self.type2 = np.zeros((k, 2, size), dtype=np.int64)
+        self.base_spe = np.zeros((k, 2, size), dtype=np.int64)
+        self.moves = np.zeros((k, 2, size, MAX_MOVES), dtype=np.int64)
+        self.pp = np.zeros((k, 2, size, MAX_MOVES), dtype=np.int64)
+        # Empty party slots count as fainted
+        self.status = np.full((k, 2, size), FNT)
+        self.sleep = np.zeros((k, 2, size), dtype=np.int64)
+        for b, pair in enumerate(rows):
+            for s, party in enumerate(pair):
+                for p, row in enumerate(party):
+                    (self.level[b, s, p], self.max_hp[b, s, p],
+                     self.raw[b, s, p], self.type1[b, s, p],
+                     self.type2[b, s, p], self.base_spe[b, s, p],
+                     self.moves[b, s, p], self.pp[b, s, p]) = row
+                    self.status[b, s, p] = NO_STATUS
+        self.hp = self.max_hp.copy()
+
+    def _party_rows(self, party):
+        if party == 'random':
+            species = self.rng.choice(globals.species_list, 2, replace=False)
+            party = {name: (None, 'random') for name in species}
+        elif type(party) != dict:
+            raise ValueError(f'Invalid starting party {party}; should be dict '
+                             'or "random"')
+        return [self._pokemon_row(name, level, moves)
+                for name, (level, moves) in party.items()]
+
+    def _pokemon_row(self, name, level, moves):
+        d = globals.get_species_dict(name)
+        if not d:
+            raise KeyError(f'VecBattles: species {name} not found!')
+        level = level if level else d['randomizer_level']
+        if moves == 'random':
+            n = min(MAX_MOVES, len(d['movepool']))
+            moves = list(self.rng.choice(d['movepool'], n, replace=False))
+        if len(moves) < 1 or len(moves) > MAX_MOVES:
+            raise ValueError(f'Invalid starting move list {moves} -- '
+                             'must have between 1 and 4 moves')
+        base = np.array([d['base_hp'], d['base_att'], d['base_def'],
+                         d['base_spe'], d['base_spc']])
+        stats = unmodified_stats(base, level)
+        move_ids = np.zeros(MAX_MOVES, dtype=np.int64)
+        pp = np.zeros(MAX_MOVES, dtype=np.int64)
+        for i, move in enumerate(moves):
+            move_ids[i] = self.mt.ids[move]
+            pp[i] = self.mt.max_pp[move_ids[i]]
+        return (level, stats[0] + level + 5, stats[1:],
+                type_ids[d['type1']], type_ids[d['type2']], d['base_spe'],
+                move_ids, pp)
+
+    # Random draws, matching the object engine's distributions
+
+    def _rng_check(self, pct_chance):
+        # globals.rng_check
+        return self.rng.random(len(pct_chance)) <= pct_chance / 100
+
+    def _gen1_rng_check(self, pct_chance):
+        # globals.gen1_rng_check
+        thresh = globals.gen1_rng_threshold(pct_chance)
+        return self._bytes(len(pct_chance)) < thresh
+
+    def _bytes(self, n):
+        return self.rng.integers(0, 256, n)
+
+    # Round structure
+
+    def _choose_actions(self, idx):
+        """
+        RandomAI.get_action: a uniformly random move with PP left, or
+        Struggle.
+        """
+        pp = self.pp[idx[:, None], [0, 1], self.active[idx]]
+        valid = pp > 0
+        keys = self.rng.random(valid.shape)
+        keys[~valid] = -1
+        action = keys.argmax(axis=-1)
+        action[~valid.any(axis=-1)] = STRUGGLE
+        self.action[idx] = action
+
+    def _move_ids(self, idx, side):
+        action = self.action[idx, side]
+        slot = self.active[idx, side]
+        return np.where(action == STRUGGLE, self.mt.struggle,
+                        self.moves[idx, side, slot,
+                                   np.minimum(action, MAX_MOVES-1)])
+
+    def _turn_order(self, idx):
+        """
+        RoundManager.get_turn_order for two moves: priority, then speed, then
+        a coin flip. Returns the side moving first in each battle.
+        """
+        zeros, ones = np.zeros_like(idx), np.ones_like(idx)
+        p1 = self.mt.priority[self._move_ids(idx, zeros)]
+        p2 = self.mt.priority[self._move_ids(idx, ones)]
+        s1 = self.values[idx, 0, SPE]
+        s2 = self.values[idx, 1, SPE]
+        coin = np.where(self._rng_check(np.full(len(idx), 50.)), 0, 1)
+        by_speed = np.where(s1 > s2, 0, np.where(s1 < s2, 1, coin))
+        return np.where(p1 > p2, 0, np.where(p1 < p2, 1, by_speed))
+
+    def _turn(self, idx, side):
+        """
+        RoundManager.turn for one mover per battle.
+        """
+        can_move = self._before_move(idx, side)
+        self._end_round[idx[~can_move], side[~can_move]] = True
+        idx, side = idx[can_move], side[can_move]
+        mid = self._move_ids(idx, side)
+        # Decrement PP, except for Struggle
+        used = self.action[idx, side] != STRUGGLE
+        self.pp[idx[used], side[used], self.active[idx[used], side[used]],
+                self.action[idx[used], side[used]]] -= 1
+        cat = self.mt.category[mid]
+        m = (cat == PHYSICAL) | (cat == SPECIAL)
+        self._direct_damage(idx[m], side[m], mid[m])
+        m = cat == STATUS
+        self._apply_status(idx[m], side[m], mid[m], secondary=False)
+        m = cat == STAT
+        self._apply_stat_changes(idx[m], side[m], mid[m], secondary=False)
+        # after_move, unless something fainted
+        m = ~self._faint[idx]
+        self._recurring_damage(idx[m], side[m])
+
+    def _before_move(self, idx, side):
+        """
+        TurnManager.before_move: full paralysis, sleep (decrementing the
+        counter, waking up on 0) and freeze. Returns bool array can_move.
+        """
+        slot = self.active[idx, side]
+        status = self.status[idx, side, slot]
+        fully_przd = np.zeros(len(idx), dtype=bool)
+        przd = status == PRZ
+        fully_przd[przd] = self._rng_check(
+            np.full(np.count_nonzero(przd), float(globals.FULL_PRZ_CHANCE)))
+        asleep = status == SLP
+        a = (idx[asleep], side[asleep], slot[asleep])
+        self.sleep[a] -= 1
+        woke = self.sleep[a] == 0
+        self.status[a[0][woke], a[1][woke], a[2][woke]] = NO_STATUS
+        return ~(fully_przd | asleep | (status == FRZ))
+
+    def _swap_fainted(self):
+        """
+        Trainer._process_faint_event with RandomAI.get_swap: a fainted active
+        Pokemon is replaced by a uniformly random healthy one.
+        """
+        k = np.arange(self.k)[:, None]
+        fainted = self.status[k, [0, 1], self.active] == FNT
+        alive = self.status != FNT
+        need = fainted & alive.any(axis=-1)
+        if not need.any():
+            return
+        idx, side = np.nonzero(need)
+        keys = self.rng.random(alive[idx, side].shape)
+        keys[~alive[idx, side]] = -1
+        slot = keys.argmax(axis=-1)
+        self.active[idx, side] = slot
+        # Trainer.active: reset stat stages, recalculate stats with debuff
+        self.stages[idx, side] = 0
+        self.values[idx, side] = self.raw[idx, side, slot]
+        self.toxic_on[idx, side] = False
+        self.toxic_n[idx, side] = 1
+        self._apply_debuff(idx, side)
+
+    def _update_done(self):
+        alive = (self.status != FNT).any(axis=-1)
+        out1, out2 = ~alive[:, 0], ~alive[:, 1]
+        new = ~self.done & (out1 | out2)
+        self.winner[new & out2 & ~out1] = 1
+        self.winner[new & out1 & ~out2] = 2
+        self.done |= new
+
+    # Move effects
+
+    def _acc_mult(self, idx, side):
+        """
+        User's accuracy multiplier times the opponent's evasion multiplier.
+        """
+        acc = STAGE_MULT[self.stages[idx, side, ACC] + 6]
+        eva = STAGE_MULT[-self.stages[idx, 1 - side, EVA] + 6]
+        return acc * eva
+
+    def _direct_damage(self, idx, side, mid):
+        """
+        MoveUser.apply_direct_damage and calc_damage. Light Screen and Reflect
+        are never active in the object engine, so are not applied.
+        """
+        if not idx.size:
+            return
+        pct = np.where(self.mt.acc_always[mid], 0.,
+                       self.mt.accuracy[mid] * self._acc_mult(idx, side))
+        hit = self.mt.acc_always[mid] | self._gen1_rng_check(pct)
+        idx, side, mid = idx[hit], side[hit], mid[hit]
+        if not idx.size:
+            return
+        other = 1 - side
+        u = (idx, side, self.active[idx, side])
+        t = (idx, other, self.active[idx, other])
+        n = len(idx)
+
+        # Critical hits use the unmodified stats
+        thresh = self.base_spe[u] // 2
+        high_crit = self.mt.high_crit[mid]
+        thresh = np.where(high_crit > 0,
+                          np.minimum(high_crit * thresh, 255), thresh)
+        crit = self._bytes(n) < thresh
+        physical = self.mt.category[mid] == PHYSICAL
+        a_i = np.where(physical, ATT, SPC)
+        d_i = np.where(physical, DEF, SPC)
+        a = np.where(crit, self.raw[u + (a_i,)], self.values[idx, side, a_i])
+        d = np.where(crit, self.raw[t + (d_i,)], self.values[idx, other, d_i])
+        scale = (a > 255) | (d > 255)
+        a = np.where(scale, a // 4, a)
+        d = np.where(scale, np.maximum(d // 4, 1), d)
+
+        level = self.level[u]
+        crit_mult = np.where(crit, 2, 1)
+        power = self.mt.power[mid]
+        base = ((2*level*crit_mult/5 + 2)*power*a/(d*50) + 2).astype(np.int64)
+        mtype = self.mt.type[mid]
+        stab = np.where((mtype == self.type1[u]) | (mtype == self.type2[u]),
+                        1.5, 1)
+        type1 = TYPE_CHART[mtype, self.type1[t]]
+        type2 = TYPE_CHART[mtype, self.type2[t]]
+        damage = (base * stab).astype(np.int64)
+        damage = (damage * type1).astype(np.int64)
+        damage = (damage * type2).astype(np.int64)
+        roll = self.rng.integers(MIN_DAMAGE_ROLL, MAX_DAMAGE_ROLL+1, n)
+        damage = damage * np.where(damage == 1, 255, roll) // 255
+
+        # Fixed damage and OHKO moves
+        hp = self.hp[t]
+        fixed = self.mt.fixed[mid]
+        psywave = self.rng.integers(1, (1.5*level + 1).astype(np.int64))
+        immune = DUAL_TYPE_CHART[mtype, self.type1[t], self.type2[t]] == 0
+        ohko = np.where(immune
+                        | (self.values[idx, side, SPE]
+                           < self.values[idx, other, SPE]), 0, hp)
+        damage = np.select([fixed == FD_LEVEL, fixed == FD_RANDOM,
+                            fixed == FD_HALF_CURRENT, fixed == FD_LAST_DAMAGE,
+                            fixed == FD_VALUE, fixed == FD_OHKO],
+                           [level, psywave, hp // 2, 0,
+                            self.mt.fixed_value[mid], ohko], damage)
+        self._apply_damage(t, np.minimum(damage, hp))
+
+        # Secondary effects
+        m = self.mt.status[mid] != NO_STATUS
+        self._apply_status(idx[m], side[m], mid[m], secondary=True)
+        m = self.mt.stat_index[mid] != 0
+        self._apply_stat_changes(idx[m], side[m], mid[m], secondary=True)
+
+    def _apply_damage(self, t, damage):
+        """
+        Pokemon.current_hp setter: KO'd Pokemon get status FNT, which ends the
+        round; their trainer swaps at the end of the step.
+        """
+        hp = self.hp[t] - damage
+        self.hp[t] = hp
+        fainted = hp <= 0
+        if fainted.any():
+            f = (t[0][fainted], t[1][fainted], t[2][fainted])
+            self.hp[f] = 0
+            self.status[f] = FNT
+            self._faint[f[0]] = True
+
+    def _apply_status(self, idx, side, mid, secondary):
+        """
+        MoveUser.apply_status and attempt_status_overwrite.
+        """
+        if not idx.size:
+            return
+        tside = np.where(self.mt.status_self[mid], side, 1 - side)
+        t = (idx, tside, self.active[idx, tside])
+        mtype = self.mt.type[mid]
+        status = self.mt.status[mid]
+        type1, type2 = self.type1[t], self.type2[t]
+        blocked = ((mtype == type_ids['Electric'])
+                   & ((type1 == type_ids['Ground'])
+                      | (type2 == type_ids['Ground'])))
+        blocked |= (((status == PSN) | (status == TXC))
+                    & ((type1 == type_ids['Poison'])
+                       | (type2 == type_ids['Poison'])))
+        current = self.status[t]
+        has_status = (current != NO_STATUS) & ~blocked
+        fresh = (current == NO_STATUS) & ~blocked
+        if secondary:
+            # No status from a damaging move of the target's own type, but a
+            # fire move that could burn thaws a frozen target
+            fresh &= (mtype != type1) & (mtype != type2)
+            has_status &= (mtype != type1) & (mtype != type2)
+            thaw = has_status & (current == FRZ) & (status == BRN)
+            self.status[t[0][thaw], t[1][thaw], t[2][thaw]] = NO_STATUS
+            hit = fresh & self._rng_check(self.mt.status_accuracy[mid])
+        else:
+            always = self.mt.status_acc_always[mid]
+            pct = np.where(always, 0.,
+                           self.mt.status_accuracy[mid]
+                           * self._acc_mult(idx, side))
+            hit = fresh & (always | self._rng_check(pct))
+            # Rest overwrites an existing status, if not at full HP
+            hit |= (has_status & (mid == self.mt.rest)
+                    & (self.hp[t] < self.max_hp[t]))
+        self._proc_status((t[0][hit], t[1][hit], t[2][hit]), mid[hit])
+
+    def _proc_status(self, t, mid):
+        """
+        MoveUser.proc_status.
+        """
+        if not mid.size:
+            return
+        status = self.mt.status[mid]
+        self.status[t] = status
+        idx, side = t[0], t[1]
+        m = status == PRZ
+        self.values[idx[m], side[m], SPE] = np.maximum(
+            self.values[idx[m], side[m], SPE] // 4, 1)
+        m = status == BRN
+        self.values[idx[m], side[m], ATT] = np.maximum(
+            self.values[idx[m], side[m], ATT] // 2, 1)
+        m = status == SLP
+        rest = mid[m] == self.mt.rest
+        s = (t[0][m], t[1][m], t[2][m])
+        self.hp[s] = np.where(rest, self.max_hp[s], self.hp[s])
+        self.sleep[s] = np.where(
+            rest, 2, self.rng.integers(globals.MIN_SLP_TURNS,
+                                       globals.MAX_SLP_TURNS+1, len(rest)))
+        m = status == TXC
+        self.toxic_on[idx[m], side[m]] = True
+        self.toxic_n[idx[m], side[m]] = 1
+
+    def _apply_stat_changes(self, idx, side, mid, secondary):
+        """
+        MoveUser.apply_stat_changes, including the Gen 1 quirks: the changed
+        stat is recalculated without its BRN/PRZ debuff, and the user's
+        opponent has its debuff applied again.
+        """
+        if not idx.size:
+            return
+        always = self.mt.stat_acc_always[mid]
+        pct = self.mt.stat_accuracy[mid]
+        if not secondary:
+            pct = np.where(always, 0., pct * self._acc_mult(idx, side))
+        hit = always | self._rng_check(pct)
+        idx, side, mid = idx[hit], side[hit], mid[hit]
+        tside = np.where(self.mt.stat_self[mid], side, 1 - side)
+        tslot = self.active[idx, tside]
+        si = self.mt.stat_index[mid] - 1
+        new = self.stages[idx, tside, si] + self.mt.stat_delta[mid]
+        ok = (new > -7) & (new < 7)
+        new = np.clip(new, -6, 6)
+        # Stats.can_change: the new value must lie in [1, 999]
+        major = si <= SPC
+        raw = self.raw[idx, tside, tslot, np.minimum(si, SPC)]
+        val = (raw * STAGE_MULT[new + 6]).astype(np.int64)
+        ok &= ~major | ((val >= 1) & (val <= 999))
+        idx, side, tside, si, new, raw, major = (
+            idx[ok], side[ok], tside[ok], si[ok], new[ok], raw[ok], major[ok])
+        self.stages[idx, tside, si] = new
+        self.values[idx[major], tside[major], si[major]] = (
+            raw[major] * STAGE_MULT[new[major] + 6]).astype(np.int64)
+        self._apply_debuff(idx, 1 - side)
+
+    def _apply_debuff(self, idx, side):
+        """
+        Stats.apply_status_debuff for the active Pokemon on each side.
+        """
+        status = self.status[idx, side, self.active[idx, side]]
+        m = status == BRN
+        self.values[idx[m], side[m], ATT] = np.maximum(
+            self.values[idx[m], side[m], ATT] // 2, 1)
+        m = status == PRZ
+        self.values[idx[m], side[m], SPE] = np.maximum(
+            self.values[idx[m], side[m], SPE] // 4, 1)
+
+    def _recurring_damage(self, idx, side):
+        """
+        TurnManager.apply_all_recurring_damage: BRN/PSN/TXC damage, scaled by
+        the toxic counter.
+        """
+        if not idx.size:
+            return
+        u = (idx, side, self.active[idx, side])
+        status = self.status[u]
+        m = (status == BRN) | (status == PSN) | (status == TXC)
+        u, idx, side = (u[0][m], u[1][m], u[2][m]), idx[m], side[m]
+        n = self.toxic_n[idx, side]
+        damage = n * (self.max_hp[u] // 16)
+        damage = np.maximum(damage, 1)
+        self._apply_damage(u, np.minimum(damage, self.hp[u]))
+        on = self.toxic_on[idx, side]
+        self.toxic_n[idx[on], side[on]] = np.minimum(n[on] + 1, MAX_TOXIC_N)
@@ -0,0 +1,173 @@
+"""
+Species-vs-species 1v1 win rate matrix. Every species fights at its
+randomizer level with a random moveset from its movepool, drawn anew for
+every battle. matrix[i, j] is the win rate of species_list[i] against
+species_list[j] (draws count as half a win); each unordered pair is only
+simulated once, as matrix[j, i] = 1 - matrix[i, j], and the diagonal is 0.5.
+
+The matrix is a memory-mapped .npy file that doubles as the checkpoint:
+cells that are still NaN have not been computed, so a job that is killed
+resumes where it stopped when run again with the same file and settings.
+Run it with
+
+    python winmatrix.py matrix.npy
+
+(see --help).
+"""
+
+import globals
+from battle import simulate
+from rng import derive_seed
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import time
+
+BATTLES = 200
+# Pairs per task sent to a worker; completed cells are flushed to disk
+# after every task
+CHUNK_SIZE = 20
+
+
+def pairs(size):
+    """
+    Returns the unordered pairs (i, j), i < j, of size species, in the order
+    that fixes their seeds.
+    """
+    return [(i, j) for i in range(size) for j in range(i + 1, size)]
+
+
+def species_party(name):
+    species = globals.get_species_dict(name)
+    return {name: (species['randomizer_level'], 'random')}
+
+
+def _settings(species, n, ai, seed, max_rounds):
+    return {'species': list(species), 'battles': n, 'ai': ai, 'seed': seed,
+            'max_rounds': max_rounds}
+
+
+def open_matrix(path, settings):
+    """
+    Opens the matrix at path for the given settings (stored next to it as
+    path + '.json'), creating it filled with NaN if it does not exist yet.
+    Raises ValueError if an existing matrix was started with other settings.
+    """
+    import numpy as np
+    from numpy.lib.format import open_memmap
+    size = len(settings['species'])
+    settings_path = path + '.json'
+    if os.path.exists(path):
+        try:
+            with open(settings_path) as f:
+                saved = json.load(f)
+        except OSError:
+            saved = None
+        if saved != settings:
+            raise ValueError(f'{path} was started with different settings; '
+                             'use a new file')
+        matrix = open_memmap(path, mode='r+')
+        if matrix.shape != (size, size):
+            raise ValueError(f'{path} has shape {matrix.shape}, expected '
+                             f'{(size, size)}')
+        return matrix
+    with open(settings_path, 'w') as f:
+        json.dump(settings, f)
+    # Initialize under a temporary name, so that a job killed meanwhile
+    # never leaves zeros that look like computed cells
+    tmp = f'{path}.{os.getpid()}.tmp'
+    matrix = open_memmap(tmp, mode='w+', dtype=np.float64,
+                         shape=(size, size))
+    matrix[:] = np.nan
+    np.fill_diagonal(matrix, 0.5)
+    matrix.flush()
+    del matrix
+    os.replace(tmp, path)
+    return open_memmap(path, mode='r+')
+
+
+def _run_chunk(chunk):
+    """
+    Worker entry point: returns [(i, j, win rate of i against j)] for a
+    chunk of pairs.
+    """
+    results = []
+    for i, j, seed in chunk['pairs']:
+        res = simulate(chunk['parties'][i], chunk['parties'][j],
+                       chunk['ai'], chunk['ai'], chunk['n'],
+                       chunk['max_rounds'], seed=seed)
+        results.append((i, j, (res['wins1'] + res['draws']/2)/res['battles']))
+    return results
+
+
+def run_matrix(path, n=BATTLES, ai='random', seed=0, workers=None,
+               chunk_size=CHUNK_SIZE, max_rounds=1000, species=None,
+               log=print):
+    """
+    Computes (or resumes) the win rate matrix at path with n battles per
+    pair, across a process pool with the given number of workers (default:
+    all cores). Pair k is seeded with derive_seed(seed, k), so the result
+    does not depend on the number of workers or on interruptions. species
+    defaults to globals.species_list. Returns the memory-mapped matrix.
+    """
+    import numpy as np
+    species = list(globals.species_list if species is None else species)
+    matrix = open_matrix(path, _settings(species, n, ai, seed, max_rounds))
+    parties = {i: species_party(name) for i, name in enumerate(species)}
+    todo = [(i, j, derive_seed(seed, k))
+            for k, (i, j) in enumerate(pairs(len(species)))
+            if np.isnan(matrix[i, j])]
+    total = len(species)*(len(species) - 1)//2
+    log(f'{total - len(todo)}/{total} pairs done')
+    if not todo:
+        return matrix
+    chunks = []
+    for first in range(0, len(todo), chunk_size):
+        chunk_pairs = todo[first:first + chunk_size]
+        used = {i for pair in chunk_pairs for i in pair[:2]}
+        chunks.append({'pairs': chunk_pairs, 'n': n, 'ai': ai,
+                       'max_rounds': max_rounds,
+                       'parties': {i: parties[i] for i in used}})
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    done = 0
+
+    def save(results):
+        nonlocal done
+        # The mirror cell is written first, so a cell is only counted as
+        # done once both halves are
+        for i, j, rate in results:
+            matrix[j, i] = 1 - rate
+            matrix[i, j] = rate
+        matrix.flush()
+        done += len(results)
+        elapsed = time.perf_counter() - start
+        log(f'{total - len(todo) + done}/{total} pairs done '
+            f'({done/elapsed:.1f} pairs/s)')
+
+    if workers == 1:
+        for chunk in chunks:
+            save(_run_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                save(future.result())
+    return matrix
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Compute or resume the species win rate matrix.')
+    parser.add_argument('path', help='.npy file for the matrix')
+    parser.add_argument('-n', '--battles', type=int, default=BATTLES,
+                        help='battles per pair')
+    parser.add_argument('--ai', default='random', help='AI of both trainers')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    run_matrix(args.path, n=args.battles, ai=args.ai, seed=args.seed,
+               workers=args.workers, chunk_size=args.chunk_size)